@@ -0,0 +1,45 @@
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Runs the per-file work of the analysis scripts on a pool of worker processes
+# Results are returned in the order of the files, whatever the order in which the workers finish.
+# Workers are forked, so the work function can be defined in the plotting script itself: the scripts have no
+# __main__ guard and a spawned worker would run the whole script again. Without fork (Windows) the files are
+# processed one after another.
+
+def process_files(work, file_paths, *args, workers=None, progress=True):
+    return process_items(work, file_paths, *args, workers=workers, progress=progress, unit="files")
+
+# Same as process_files for any picklable work items (e.g. chunks of parameter sets)
+def process_items(work, items, *args, workers=None, progress=True, unit="items"):
+    items = list(items)
+    results = [None]*len(items)
+    workers = min(workers or os.cpu_count() or 1, len(items))
+
+    if workers <= 1 or 'fork' not in multiprocessing.get_all_start_methods():
+        for i, item in enumerate(items):
+            results[i] = work(item, *args)
+            if progress:
+                print_progress(i + 1, len(items), unit)
+        return results
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as executor:
+        futures = {executor.submit(work, item, *args): i for i, item in enumerate(items)}
+        for done, future in enumerate(as_completed(futures), 1):
+            results[futures[future]] = future.result()
+            if progress:
+                print_progress(done, len(items), unit)
+    return results
+
+# Same as process_files for a list of file groups (one per speed, load...), all files share the same pool
+# Returns one list of results per group
+def process_file_groups(work, groups, *args, workers=None, progress=True):
+    groups = [list(group) for group in groups]
+    results = iter(process_files(work, [file_path for group in groups for file_path in group], *args,
+                                 workers=workers, progress=progress))
+    return [[next(results) for _ in group] for group in groups]
+
+def print_progress(done, total, unit="files"):
+    print(f"\rProcessed {done}/{total} {unit}", end='\n' if done == total else '', file=sys.stderr, flush=True)
@@ -0,0 +1,54 @@
+import numpy as np
+
+# Command stages of PAWS, one per mode, selected once when PAWS is constructed
+# update(foot_contact, timestamp) writes the position commands of all legs into a preallocated
+# buffer and returns it with the torque limit. The buffer is reused on the next tick.
+
+# Return the weights packing a foot contact array into a LUT index (first leg is the most significant bit)
+def get_contact_weights(num_controllers):
+    return 2**np.arange(num_controllers - 1, -1, -1)
+
+class LUTCommand:
+    def __init__(self, LUT, max_torque):
+        self.LUT = np.asarray(LUT, dtype=float)
+        self.max_torque = max_torque
+        num_controllers = self.LUT.shape[1]
+        if self.LUT.shape[0] != 2**num_controllers:
+            raise ValueError(f"LUT needs {2**num_controllers} rows for {num_controllers} controllers.")
+        self.weights = get_contact_weights(num_controllers)
+        self.position = np.zeros(num_controllers)
+
+    def get_index(self, foot_contact):
+        return int(np.dot(foot_contact, self.weights))
+
+    def update(self, foot_contact, timestamp):
+        np.take(self.LUT, self.get_index(foot_contact), axis=0, out=self.position)
+        return self.position, self.max_torque
+
+class ConstantCommand:
+    def __init__(self, position, max_torque):
+        self.position = np.array(position, dtype=float)
+        self.max_torque = max_torque
+
+    def update(self, foot_contact, timestamp):
+        return self.position, self.max_torque
+
+class CPGCommand:
+    def __init__(self, hopf, max_torque):
+        self.hopf = hopf
+        self.max_torque = max_torque
+        self.position = np.zeros(len(hopf.get_theta()))
+
+    def update(self, foot_contact, timestamp):
+        self.position[:] = self.hopf.update(foot_contact, timestamp)
+        return self.position, self.max_torque
+
+class SineCommand:
+    def __init__(self, sine, max_torque, num_controllers):
+        self.sine = sine
+        self.max_torque = max_torque
+        self.position = np.zeros(num_controllers)
+
+    def update(self, foot_contact, timestamp):
+        self.position[:] = self.sine.update(foot_contact, timestamp)
+        return self.position, self.max_torque
@@ -0,0 +1,63 @@
+import json
+import os
+import numpy as np
+
+# Per-leg foot contact thresholds estimated from the pressure read with the feet unloaded and loaded
+# The contact threshold is halfway between the unloaded and loaded pressure, with a hysteresis band of
+# NOISE_FACTOR standard deviations of the noise on each side, limited to a quarter of the pressure rise.
+# Thresholds are saved to a small JSON file per robot, which later runs load instead of sampling again.
+
+CALIBRATION_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'contact_calibration.json')
+NOISE_FACTOR = 3
+MIN_SEPARATION = 6      # minimum pressure rise, in noise standard deviations, for a usable calibration
+PRESSURE_RESOLUTION = 0.1   # resolution of the pressure readings, the noise is never taken below it
+
+# Running mean and variance of every leg (Welford's algorithm), the samples are not stored
+class RunningStats:
+    def __init__(self, num_legs):
+        self.count = 0
+        self.mean = np.zeros(num_legs)
+        self.m2 = np.zeros(num_legs)
+        self.delta = np.zeros(num_legs)
+
+    def add(self, values):
+        self.count += 1
+        np.subtract(values, self.mean, out=self.delta)
+        self.mean += self.delta/self.count
+        self.m2 += self.delta*(values - self.mean)
+
+    def get_std(self):
+        return np.sqrt(self.m2/max(self.count - 1, 1))
+
+# Return the rising and falling thresholds of the legs in idx from the statistics of the unloaded and loaded phases
+def get_contact_thresholds(unloaded, loaded, idx):
+    rise = loaded.mean[idx] - unloaded.mean[idx]
+    noise = np.maximum(np.maximum(unloaded.get_std(), loaded.get_std())[idx], PRESSURE_RESOLUTION)
+    if np.any(rise <= 0) or np.any(rise < MIN_SEPARATION*noise):
+        raise ValueError(f"Loaded pressure is not clearly above the unloaded pressure (rise {rise}, noise {noise}).")
+    threshold = (unloaded.mean[idx] + loaded.mean[idx])/2
+    hysteresis = np.minimum(NOISE_FACTOR*noise, rise/4)
+    return threshold + hysteresis, threshold - hysteresis
+
+# Save the calibration of the legs in controller_ids, thresholds are given in the order of controller_ids
+def save_calibration(file_name, controller_ids, unloaded, loaded, rising_thr, falling_thr):
+    calibration = {}
+    noise = np.maximum(unloaded.get_std(), loaded.get_std())
+    for k, i in enumerate(controller_ids):
+        calibration[str(i)] = {
+            "unloaded": unloaded.mean[i-1], "loaded": loaded.mean[i-1], "noise": noise[i-1],
+            "rising_thr": rising_thr[k], "falling_thr": falling_thr[k],
+        }
+    with open(file_name, 'w') as f:
+        json.dump(calibration, f, indent=4)
+
+# Return the rising and falling thresholds of a calibration file, legs missing from the file keep default_thr
+def load_calibration(file_name, default_thr):
+    rising_thr = np.array(default_thr, dtype=float)
+    falling_thr = rising_thr.copy()
+    with open(file_name, 'r') as f:
+        calibration = json.load(f)
+    for i, leg in calibration.items():
+        rising_thr[int(i)-1] = leg["rising_thr"]
+        falling_thr[int(i)-1] = leg["falling_thr"]
+    return rising_thr, falling_thr
@@ -0,0 +1,105 @@
+import copy
+import numpy as np
+
+# Online foot contact detector of PAWS, one state per leg, updated once per tick for all legs at once
+# The pressure is smoothed with an exponential moving average (alpha = 1 disables the filter). A leg enters contact
+# when the smoothed pressure rises above its rising threshold and leaves it when it falls back to its falling
+# threshold or below, and a transition is only accepted after the leg stayed min_dwell seconds in its state.
+# All arrays are allocated at construction, update() does not allocate.
+
+class ContactDetector:
+    def __init__(self, rising_thr, falling_thr=None, alpha=1, min_dwell=0):
+        self.rising_thr = np.array(rising_thr, dtype=float)
+        self.falling_thr = np.array(rising_thr if falling_thr is None else falling_thr, dtype=float)
+        if np.any(self.falling_thr > self.rising_thr):
+            raise ValueError("Falling thresholds must not be above the rising thresholds.")
+        self.alpha = alpha
+        self.min_dwell = min_dwell
+        num_legs = len(self.rising_thr)
+
+        # Undebounced detector comparing the raw pressure to the middle of the hysteresis band
+        self.raw_thr = (self.rising_thr + self.falling_thr)/2
+
+        self.filtered = np.zeros(num_legs)
+        self.contact = np.zeros(num_legs, dtype=bool)
+        self.changed = np.zeros(num_legs, dtype=bool)   # transitions accepted during the last update
+        self.raw_contact = np.zeros(num_legs, dtype=bool)
+        self.last_change = np.full(num_legs, -np.inf)
+        self.transitions = np.zeros(num_legs, dtype=int)
+        self.raw_transitions = np.zeros(num_legs, dtype=int)
+        self.initialized = False
+
+        # Scratch buffers
+        self.scratch = np.zeros(num_legs)
+        self.above = np.zeros(num_legs, dtype=bool)
+        self.ready = np.zeros(num_legs, dtype=bool)
+
+    # Set the thresholds of all legs, e.g. after a calibration
+    def set_thresholds(self, rising_thr, falling_thr=None):
+        self.rising_thr[:] = rising_thr
+        self.falling_thr[:] = rising_thr if falling_thr is None else falling_thr
+        np.add(self.rising_thr, self.falling_thr, out=self.raw_thr)
+        self.raw_thr *= 0.5
+
+    # Update the contact state of every leg from the last pressure readings, timestamp in seconds
+    # Returns the contact array, which is updated in place
+    def update(self, pressure, timestamp):
+        if self.initialized:
+            np.multiply(pressure, self.alpha, out=self.scratch)
+            self.filtered *= 1 - self.alpha
+            self.filtered += self.scratch
+        else:
+            self.filtered[:] = pressure
+            self.initialized = True
+
+        # Transitions of the undebounced detector
+        np.greater(pressure, self.raw_thr, out=self.above)
+        np.not_equal(self.above, self.raw_contact, out=self.changed)
+        self.raw_transitions += self.changed
+        self.raw_contact[:] = self.above
+
+        # Requested state: in contact above the rising threshold, or above the falling threshold when already in contact
+        np.greater(self.filtered, self.falling_thr, out=self.changed)
+        self.changed &= self.contact
+        np.greater(self.filtered, self.rising_thr, out=self.above)
+        self.changed |= self.above
+        self.changed ^= self.contact
+
+        # Hold the state of legs that changed less than min_dwell seconds ago
+        np.subtract(timestamp, self.last_change, out=self.scratch)
+        np.greater_equal(self.scratch, self.min_dwell, out=self.ready)
+        self.changed &= self.ready
+
+        self.contact ^= self.changed
+        np.copyto(self.last_change, timestamp, where=self.changed)
+        self.transitions += self.changed
+        return self.contact
+
+    # Contact state after every row of a pressure sequence (samples x legs), the same as calling update on each row
+    # The detector is left unchanged. Without min_dwell the thresholds are evaluated for all samples at once, a leg holds
+    # its state until the last sample where the smoothed pressure was above the rising threshold or not above the
+    # falling threshold. With min_dwell the rows are stepped through a copy of the detector, which needs the timestamps.
+    def evaluate(self, pressure, timestamps=None):
+        pressure = np.asarray(pressure, dtype=float)
+        if self.min_dwell > 0:
+            if timestamps is None:
+                raise ValueError("A minimum dwell time needs the timestamps of the pressure readings.")
+            detector = copy.deepcopy(self)
+            return np.array([detector.update(pressure[k], timestamps[k]).copy() for k in range(len(pressure))])
+
+        # The moving average is sequential, it is stepped row by row with the arithmetic of update
+        filtered = pressure.copy()
+        if self.alpha != 1:
+            start = 0 if self.initialized else 1
+            previous = self.filtered if self.initialized else pressure[0]
+            for k in range(start, len(pressure)):
+                filtered[k] = previous*(1 - self.alpha) + pressure[k]*self.alpha
+                previous = filtered[k]
+        above = filtered > self.rising_thr
+        decided = above | (filtered <= self.falling_thr)
+        last = np.maximum.accumulate(np.where(decided, np.arange(len(pressure))[:, None], -1), axis=0)
+        return np.where(last >= 0, np.take_along_axis(above, np.maximum(last, 0), axis=0), self.contact)
+
+    # Transitions of the undebounced detector that were filtered out, per leg
+    def get_suppressed_transitions(self):
+        return np.maximum(self.raw_transitions - self.transitions, 0)
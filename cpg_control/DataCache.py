@@ -0,0 +1,115 @@
+import hashlib
+import marshal
+import os
+import numpy as np
+import pandas as pd
+from LogReader import read_log
+
+# On-disk cache of parsed logs and derived features for the analysis scripts
+# Entries are .npz files named by a hash of the absolute path, size and modification time of the source file,
+# so an edited or replaced log is parsed again. Features are also keyed by the code of the function computing them.
+# When the cache grows over max_size bytes, the least recently used entries are removed.
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+MAX_CACHE_SIZE = 1 << 30
+
+class DataCache:
+    def __init__(self, cache_dir=CACHE_DIR, max_size=MAX_CACHE_SIZE):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def get_key(self, file_name, *extra):
+        stat = os.stat(file_name)
+        key = hashlib.sha1(repr((os.path.abspath(file_name), stat.st_size, stat.st_mtime_ns)).encode())
+        for item in extra:
+            key.update(item if isinstance(item, bytes) else repr(item).encode())
+        return key.hexdigest()
+
+    def get_path(self, key):
+        return os.path.join(self.cache_dir, key + '.npz')
+
+    # Return the columns of a CSV or binary log as a DataFrame, parsing the file only on a cache miss
+    def read_log(self, file_name):
+        path = self.get_path(self.get_key(file_name, 'log'))
+        entry = self.load(path)
+        if entry is not None:
+            return pd.DataFrame(entry['records'])
+
+        # The columns are stored as a single record array, which loads much faster than one array per column
+        # Object columns (the columns of empty logs) are stored as strings, entries are loaded without pickle
+        data = read_log(file_name)
+        columns = [data[c].values.astype(str) if data[c].dtype == object else data[c].values for c in data.columns]
+        self.save(path, records=np.rec.fromarrays(columns, names=list(data.columns)))
+        return data
+
+    # Return compute(file_name, *args), which is only called on a cache miss
+    # The result is a scalar, an array or a dict of arrays
+    def get_features(self, file_name, compute, *args):
+        code = marshal.dumps(compute.__code__)
+        path = self.get_path(self.get_key(file_name, compute.__name__, code, args))
+        entry = self.load(path)
+        if entry is not None:
+            if '__value__' in entry:
+                value = entry['__value__']
+                return value[()] if value.ndim == 0 else value
+            return dict(entry)
+
+        result = compute(file_name, *args)
+        if isinstance(result, dict):
+            self.save(path, **result)
+        else:
+            self.save(path, __value__=np.asarray(result))
+        return result
+
+    # Load an entry and mark it as recently used, None on a miss or an unreadable entry
+    def load(self, path):
+        if not os.path.exists(path):
+            return None
+        # Another process may remove the entry at any point, which is a miss
+        try:
+            with np.load(path) as entry:
+                arrays = {name: entry[name] for name in entry.files}
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, EOFError):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return arrays
+
+    # Write to a temporary file first, so that an interrupted run does not leave a truncated entry
+    # The temporary file is named by process, concurrent runs writing the same entry do not share it
+    def save(self, path, **arrays):
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(temp_path, path)
+        self.evict()
+
+    def get_size(self):
+        return sum(entry.stat().st_size for entry in os.scandir(self.cache_dir) if entry.name.endswith('.npz'))
+
+    # Remove the least recently used entries until the cache fits in max_size
+    def evict(self):
+        entries = [entry for entry in os.scandir(self.cache_dir) if entry.name.endswith('.npz')]
+        size = sum(entry.stat().st_size for entry in entries)
+        for entry in sorted(entries, key=lambda entry: entry.stat().st_mtime):
+            if size <= self.max_size:
+                break
+            size -= entry.stat().st_size
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.npz'):
+                os.remove(entry.path)
@@ -1,34 +1,104 @@
 import csv
+import json
+import os
+import queue
+import threading
+import time
+import numpy as np
 from datetime import datetime
 
+# CSV writes one text row per line
+# BINARY appends fixed-size records to a .bin file described by a JSON header, see LogReader
+FILE_FORMATS = ["CSV", "BINARY"]
+CLOSE_TIMEOUT = 5       # time close() waits for the writer thread to write the queued rows (s)
+
 class DataLogger:
-    def __init__(self, prefix=""):
+    def __init__(self, prefix="", buffered=False, queue_size=1000, flush_interval=0.5, flush_size=100,
+                 file_format="CSV", chunk_size=1000):
         self.fields = []
         self.data = {}
         self.decimals = {}
+        self.dtypes = {}
         self.file_name = None
         self.prefix = prefix
+        if file_format not in FILE_FORMATS:
+            raise ValueError(file_format + ' not implemented.')
+        self.file_format = file_format
+
+        # Binary format: records are collected in a preallocated chunk of up to chunk_size records, which is written
+        # (handed over to the writer thread in buffered mode) every flush_size records or flush_interval seconds, so
+        # that a killed process loses no more records than the CSV writer thread would
+        self.chunk_size = chunk_size
+        self.chunk = None
+        self.chunk_length = 0
+        self.last_chunk = 0
+
+        # Buffered mode: rows are queued by write_line and written in batches by a background thread
+        self.buffered = buffered
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.flush_interval = flush_interval    # maximum time between two flushes (s)
+        self.flush_size = flush_size            # maximum number of rows between two flushes
+        self.file = None
+        self.thread = None
+        self.written_lines = 0
+        self.dropped_lines = 0
+        self.max_queue_depth = 0
+        self.error = None                       # exception that stopped the writer thread
 
     def create_file(self, file_name=None):
+        extension = '.csv' if self.file_format == "CSV" else '.bin'
         if file_name is None:
             if self.prefix != "":
                 self.prefix = self.prefix + "_"
-            self.file_name = self.prefix + datetime.now().strftime('%Y%m%d_%H%M%S') + '.csv'
+            self.file_name = self.prefix + datetime.now().strftime('%Y%m%d_%H%M%S') + extension
         else:
             self.file_name = file_name
-        with open(self.file_name, 'w', newline='') as csvfile:
-            self.writer = csv.DictWriter(csvfile, fieldnames=self.fields)
-            self.writer.writeheader()
 
-    def add_field(self, field_name, decimals=None):
+        if self.file_format == "BINARY":
+            self.create_binary_file()
+        else:
+            with open(self.file_name, 'w', newline='') as csvfile:
+                self.writer = csv.DictWriter(csvfile, fieldnames=self.fields)
+                self.writer.writeheader()
+
+        if self.buffered:
+            if self.file_format == "BINARY":
+                self.file = open(self.file_name, 'ab')
+            else:
+                self.file = open(self.file_name, 'a', newline='')
+            self.thread = threading.Thread(target=self.write_rows, daemon=True)
+            self.thread.start()
+
+    # Write the JSON header describing the records and create the empty record file
+    def create_binary_file(self):
+        header = {
+            "fields": self.fields,
+            "formats": [self.dtypes[field] for field in self.fields],
+            "decimals": [self.decimals[field] for field in self.fields],
+        }
+        with open(os.path.splitext(self.file_name)[0] + '.json', 'w') as f:
+            json.dump(header, f, indent=2)
+        open(self.file_name, 'wb').close()
+        self.chunk = np.zeros(self.chunk_size, dtype=self.get_dtype())
+        self.chunk_length = 0
+        self.last_chunk = time.monotonic()
+
+    # dtype is the NumPy type of the field in the binary format (e.g. '?' for booleans)
+    def add_field(self, field_name, decimals=None, dtype='f8'):
         self.fields.append(field_name)
         self.data[field_name] = None
         self.decimals[field_name] = decimals
+        self.dtypes[field_name] = dtype
+
+    # Return the structured dtype of a binary record
+    def get_dtype(self):
+        return np.dtype([(field, self.dtypes[field]) for field in self.fields])
 
     def set_field(self, field_name, value):
         if field_name in self.fields:
             decimals = self.decimals.get(field_name)
-            if decimals is not None and isinstance(value, (int, float)):
+            # Binary records keep full precision
+            if decimals is not None and self.file_format == "CSV" and isinstance(value, (int, float)):
                 self.data[field_name] = round(value, decimals)
             else:
                 self.data[field_name] = value
@@ -40,21 +110,124 @@ class DataLogger:
         for field in self.fields:
             if self.data[field] is None:
                 raise ValueError(f"Field '{field}' has not been set.")
+
+        if self.file_format == "BINARY":
+            self.chunk[self.chunk_length] = tuple(self.data[field] for field in self.fields)
+            self.chunk_length += 1
+            if (self.chunk_length >= min(self.flush_size, self.chunk_size)
+                    or time.monotonic() - self.last_chunk >= self.flush_interval):
+                self.write_chunk()
+            return
+
+        if self.buffered:
+            # Never block the caller, rows are dropped when the writer thread falls behind
+            try:
+                self.queue.put_nowait([self.data[field] for field in self.fields])
+            except queue.Full:
+                self.dropped_lines += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queue.qsize())
+            return
+
         try:
             with open(self.file_name, 'a', newline='') as csvfile:
                 self.writer = csv.DictWriter(csvfile, fieldnames=self.fields)
                 self.writer.writerow(self.data)
+                self.written_lines += 1
         except Exception as e:
             print(f"Error writing line: {e}")
             raise
 
+    # Append the filled part of the chunk to the binary file
+    # In buffered mode the chunk is handed over to the writer thread
+    def write_chunk(self):
+        self.last_chunk = time.monotonic()
+        if self.chunk_length == 0:
+            return
+        if self.buffered:
+            try:
+                self.queue.put_nowait(self.chunk[:self.chunk_length].copy())
+            except queue.Full:
+                self.dropped_lines += self.chunk_length
+            self.max_queue_depth = max(self.max_queue_depth, self.queue.qsize())
+        else:
+            with open(self.file_name, 'ab') as f:
+                self.chunk[:self.chunk_length].tofile(f)
+            self.written_lines += self.chunk_length
+        self.chunk_length = 0
+
+    # Background thread of the buffered mode, writes queued rows until close() is called
+    # A write error (e.g. disk full) stops the thread, it is kept in self.error and the rows queued later are dropped
+    def write_rows(self):
+        try:
+            self.write_queued_rows()
+        except Exception as e:
+            self.error = e
+            print(f"Logger: writing {self.file_name} failed: {e}")
+
+    def write_queued_rows(self):
+        writer = csv.writer(self.file)
+        rows = []
+        last_flush = time.monotonic()
+        running = True
+        while running:
+            try:
+                row = self.queue.get(timeout=self.flush_interval)
+                if row is None:
+                    running = False
+                elif isinstance(row, np.ndarray):
+                    # Chunk of binary records
+                    row.tofile(self.file)
+                    self.file.flush()
+                    self.written_lines += len(row)
+                else:
+                    rows.append(row)
+            except queue.Empty:
+                pass
+
+            now = time.monotonic()
+            if rows and (not running or len(rows) >= self.flush_size or now - last_flush >= self.flush_interval):
+                writer.writerows(rows)
+                self.file.flush()
+                self.written_lines += len(rows)
+                rows = []
+                last_flush = now
+
+    def get_queue_depth(self):
+        return self.queue.qsize()
+
+    # Write the rows still queued and close the file
+    def close(self):
+        if self.file_format == "BINARY":
+            self.write_chunk()
+        if self.thread is not None:
+            # Do not wait on a thread that stopped on a write error, or longer than CLOSE_TIMEOUT on a stalled one
+            if self.thread.is_alive():
+                try:
+                    self.queue.put(None, timeout=CLOSE_TIMEOUT)
+                except queue.Full:
+                    pass
+                self.thread.join(timeout=CLOSE_TIMEOUT)
+            if self.thread.is_alive():
+                print(f"Logger: the writer thread did not finish within {CLOSE_TIMEOUT} s")
+            self.thread = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def print_statistics(self):
+        print(f"Logger: {self.written_lines} lines written, {self.dropped_lines} dropped, "
+              f"maximum queue depth {self.max_queue_depth}/{self.queue.maxsize}")
+        if self.error is not None:
+            print(f"Logger: the writer thread stopped on an error: {self.error!r}")
+
     def get_file_name(self):
         return self.file_name
-    
+
     def delete_file(self):
-        import os
         try:
             os.remove(self.file_name)
+            if self.file_format == "BINARY":
+                os.remove(os.path.splitext(self.file_name)[0] + '.json')
         except Exception as e:
             print(f"Error deleting file: {e}")
-            raise
\ No newline at end of file
+            raise
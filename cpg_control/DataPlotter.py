@@ -1,16 +1,36 @@
 import matplotlib.pyplot as plt
 from matplotlib import animation
+from matplotlib.patches import Rectangle
 import csv
+import os
+import numpy as np
 from multiprocessing import Process
+from SharedBuffer import SharedRingBuffer
 
 class DataPlotter:
-    def __init__(self, csv_file):
+    # Data is read from the CSV file written by DataLogger, or from a SharedRingBuffer when one is given
+    def __init__(self, csv_file=None, shared_buffer=None):
         self.processes = []
         self.csv_file = csv_file
-    
+        self.shared_buffer = shared_buffer
+
     def create_process(self, numeric_fields, boolean_fields, title, y_label, max_data_points, update_interval):
-        args = (self.csv_file, numeric_fields, boolean_fields, title, y_label, max_data_points, update_interval)
-        p = Process(target=plot_live_data, args=args)
+        if self.shared_buffer is not None:
+            args = (self.shared_buffer.get_spec(), numeric_fields, boolean_fields, title, y_label, max_data_points, update_interval)
+            p = Process(target=plot_shared_data, args=args)
+        else:
+            args = (self.csv_file, numeric_fields, boolean_fields, title, y_label, max_data_points, update_interval)
+            p = Process(target=plot_live_data, args=args)
+        self.processes.append(p)
+        p.start()
+
+    # Draw all panels in one process from the shared buffer, panels is a list of (numeric_fields, title, y_label)
+    # The process runs at a lower priority (nice) so that the control loop keeps its core
+    def create_dashboard(self, panels, boolean_fields, time_window=2.0, update_interval=40, nice=10):
+        if self.shared_buffer is None:
+            raise ValueError("The dashboard needs a shared buffer.")
+        args = (self.shared_buffer.get_spec(), panels, boolean_fields, time_window, update_interval, nice)
+        p = Process(target=plot_dashboard, args=args)
         self.processes.append(p)
         p.start()
 
@@ -19,48 +39,116 @@ class DataPlotter:
             p.terminate()
             p.join()
 
+# Follow a CSV file written by DataLogger, only the lines appended since the previous read are parsed
+# The last max_data_points rows are kept in fixed-size ring buffers, missing or invalid values are NaN
+class CSVTailReader:
+    def __init__(self, csv_file, numeric_fields, boolean_fields=None, max_data_points=100):
+        self.csv_file = csv_file
+        self.numeric_fields = numeric_fields
+        self.boolean_fields = boolean_fields if boolean_fields is not None else []
+        self.max_data_points = max_data_points
+
+        self.offset = 0             # byte offset of the first unread byte
+        self.partial = b""          # last line, not terminated yet when it was read
+        self.columns = None         # column index of every field, read from the header
+
+        self.x_data = np.full(max_data_points, np.nan)
+        self.numeric_data = np.full((len(numeric_fields), max_data_points), np.nan)
+        self.boolean_data = np.full((len(self.boolean_fields), max_data_points), np.nan)
+        self.num_rows = 0           # number of rows read so far
+
+    # Parse the complete lines appended since the previous call, return the number of new rows
+    def read(self):
+        try:
+            with open(self.csv_file, 'rb') as f:
+                f.seek(self.offset)
+                data = f.read()
+        except FileNotFoundError:
+            return 0
+        self.offset += len(data)
+
+        lines = (self.partial + data).split(b"\n")
+        self.partial = lines.pop()
+        if self.columns is None and lines:
+            header = next(csv.reader([lines.pop(0).decode().rstrip("\r")]))
+            self.columns = {field: i for i, field in enumerate(header)}
+        if not lines:
+            return 0
+
+        # Only the last max_data_points rows can be displayed
+        num_new_rows = len(lines)
+        lines = lines[-self.max_data_points:]
+        for row in csv.reader(line.decode().rstrip("\r") for line in lines):
+            k = self.num_rows % self.max_data_points
+            self.x_data[k] = self.parse_number(row, "timestamp")
+            for i, field in enumerate(self.numeric_fields):
+                self.numeric_data[i, k] = self.parse_number(row, field)
+            for i, field in enumerate(self.boolean_fields):
+                self.boolean_data[i, k] = self.parse_boolean(row, field)
+            self.num_rows += 1
+        return num_new_rows
+
+    def parse_number(self, row, field):
+        try:
+            return float(row[self.columns[field]])
+        except (KeyError, IndexError, ValueError):
+            return np.nan
+
+    def parse_boolean(self, row, field):
+        try:
+            value = row[self.columns[field]].lower()
+        except (KeyError, IndexError):
+            return np.nan
+        if value == 'true':
+            return 1
+        elif value == 'false':
+            return 0
+        return np.nan
+
+    # Return the rows held in the ring buffers in chronological order
+    def get_data(self):
+        n = min(self.num_rows, self.max_data_points)
+        idx = np.arange(self.num_rows - n, self.num_rows) % self.max_data_points
+        return self.x_data[idx], self.numeric_data[:, idx], self.boolean_data[:, idx]
+
 def plot_live_data(csv_file, numeric_fields, boolean_fields, title, y_label, max_data_points=100, update_interval=20):
+    reader = CSVTailReader(csv_file, numeric_fields, boolean_fields, max_data_points)
+
+    def read_data():
+        reader.read()
+        return reader.get_data()
+
+    animate_plot(read_data, numeric_fields, boolean_fields, title, y_label, update_interval)
+
+# Plot the last max_data_points rows of a SharedRingBuffer, spec is returned by SharedRingBuffer.get_spec
+def plot_shared_data(spec, numeric_fields, boolean_fields, title, y_label, max_data_points=100, update_interval=20):
+    shared_buffer = SharedRingBuffer.attach(*spec)
+    if boolean_fields is None:
+        boolean_fields = []
+
+    def read_data():
+        rows, _ = shared_buffer.get_latest(max_data_points)
+        x_data = shared_buffer.get_column(rows, "timestamp")
+        numeric_data = [shared_buffer.get_column(rows, field) for field in numeric_fields]
+        boolean_data = [shared_buffer.get_column(rows, field) for field in boolean_fields]
+        return x_data, numeric_data, boolean_data
+
+    animate_plot(read_data, numeric_fields, boolean_fields, title, y_label, update_interval)
+
+# Animate a plot, read_data returns the x data and the lists of numeric and boolean series to draw
+def animate_plot(read_data, numeric_fields, boolean_fields, title, y_label, update_interval):
     num_numeric_fields = len(numeric_fields)
     num_boolean_fields = 0
-    if boolean_fields is not None:
+    if boolean_fields:
         num_boolean_fields = len(boolean_fields)
     colors = ['blue', 'red', 'green', 'yellow', 'purple']
 
     def update_plot(frame):
-        nonlocal x_data, numeric_data, boolean_data, lines, fill_between_objs
-
-        with open(csv_file, 'r') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                x_data.append(float(row['timestamp']))
-                for i in range(num_numeric_fields):
-                    field_name = numeric_fields[i]
-                    if field_name in row:
-                        try:
-                            numeric_data[i].append(float(row[field_name]))
-                        except ValueError:
-                            numeric_data[i].append(None)
-                    else:
-                        numeric_data[i].append(None)
-                for i in range(num_boolean_fields):
-                    field_name = boolean_fields[i]
-                    if field_name in row:
-                        value = row[field_name].lower()
-                        if value == 'true':
-                            boolean_data[i].append(1)
-                        elif value == 'false':
-                            boolean_data[i].append(0)
-                        else:
-                            boolean_data[i].append(None)
-                    else:
-                        boolean_data[i].append(None)
-
-        if len(x_data) > max_data_points:
-            x_data = x_data[-max_data_points:]
-            for i in range(num_numeric_fields):
-                numeric_data[i] = numeric_data[i][-max_data_points:]
-            for i in range(num_boolean_fields):
-                boolean_data[i] = boolean_data[i][-max_data_points:]
+        nonlocal lines, fill_between_objs
+
+        x_data, numeric_data, boolean_data = read_data()
+        if len(x_data) == 0:
+            return lines
 
         for i in range(num_numeric_fields):
             lines[i].set_data(x_data, numeric_data[i])
@@ -68,18 +156,18 @@ def plot_live_data(csv_file, numeric_fields, boolean_fields, title, y_label, max
         for i in range(num_boolean_fields):
             if fill_between_objs[i] is not None:
                 fill_between_objs[i].remove()
-            fill_between_objs[i] = ax.fill_between(x_data, 0, 1, where=[val == 1 for val in boolean_data[i]], 
+            fill_between_objs[i] = ax.fill_between(x_data, 0, 1, where=np.asarray(boolean_data[i]) == 1,
                                                    color=colors[i % len(colors)], alpha=0.15, transform=ax.get_xaxis_transform())
 
-        numeric_values = [data for sublist in numeric_data for data in sublist if data is not None]
-        if numeric_values:
-            min_y = min(numeric_values)
-            max_y = max(numeric_values)
+        numeric_values = np.asarray(numeric_data, dtype=float)
+        if np.any(~np.isnan(numeric_values)):
+            min_y = np.nanmin(numeric_values)
+            max_y = np.nanmax(numeric_values)
             ax.set_ylim(min_y - 0.5, max_y + 0.5)
         else:
             ax.set_ylim(0, 1)
 
-        ax.set_xlim(min(x_data), max(x_data))
+        ax.set_xlim(np.nanmin(x_data), np.nanmax(x_data))
 
         return lines + fill_between_objs
 
@@ -88,9 +176,6 @@ def plot_live_data(csv_file, numeric_fields, boolean_fields, title, y_label, max
     ax.set_xlabel("Time (s)")
     ax.set_ylabel(y_label)
 
-    x_data = []
-    numeric_data = [[] for _ in range(num_numeric_fields)]
-    boolean_data = [[] for _ in range(num_boolean_fields)]
     lines = [ax.plot([], [], label=numeric_fields[i])[0] for i in range(num_numeric_fields)]
     fill_between_objs = [None] * num_boolean_fields
 
@@ -99,7 +184,7 @@ def plot_live_data(csv_file, numeric_fields, boolean_fields, title, y_label, max
     for i in range(num_boolean_fields):
         boolean_patch = plt.Line2D([0], [0], color=colors[i % len(colors)], lw=4, alpha=0.15)
         handles.append(boolean_patch)
-    if boolean_fields is not None:
+    if boolean_fields:
         labels = numeric_fields + boolean_fields
     else:
         labels = numeric_fields
@@ -108,3 +193,167 @@ def plot_live_data(csv_file, numeric_fields, boolean_fields, title, y_label, max
 
     ani = animation.FuncAnimation(fig, update_plot, interval=update_interval)
     plt.show()
+
+def plot_dashboard(spec, panels, boolean_fields, time_window=2.0, update_interval=40, nice=10):
+    if nice and hasattr(os, "nice"):
+        os.nice(nice)
+    dashboard = LiveDashboard(SharedRingBuffer.attach(*spec), panels, boolean_fields, time_window, update_interval)
+    dashboard.show()
+
+# Multi-panel live plot of a SharedRingBuffer
+# Lines and foot contact spans are animated artists drawn over a cached background (blitting),
+# the background is only redrawn when the axis limits change. The time axis scrolls by half a window at a time.
+# Contact spans are extended or closed as new rows arrive, spans that left the window are removed.
+class LiveDashboard:
+    def __init__(self, shared_buffer, panels, boolean_fields, time_window=2.0, update_interval=40):
+        self.shared_buffer = shared_buffer
+        self.panels = panels
+        self.boolean_fields = boolean_fields if boolean_fields is not None else []
+        self.time_window = time_window
+        self.update_interval = update_interval
+        self.last_sequence = 0
+        self.start_time = None
+        self.window = np.zeros((0, len(shared_buffer.fields)))    # rows of the visible time window
+        self.background = None
+        colors = ['blue', 'red', 'green', 'yellow', 'purple']
+        self.span_colors = [colors[i % len(colors)] for i in range(len(self.boolean_fields))]
+
+        num_rows = (len(panels) + 1)//2
+        self.fig, axes = plt.subplots(num_rows, 2, sharex=True, figsize=(12, 3*num_rows), squeeze=False)
+        for ax in axes.flatten()[len(panels):]:
+            ax.set_visible(False)
+        self.axes = axes.flatten()[:len(panels)]
+        self.lines = []
+        for ax, (numeric_fields, title, y_label) in zip(self.axes, panels):
+            ax.set_title(title)
+            ax.set_ylabel(y_label)
+            lines = [ax.plot([], [], label=field, animated=True)[0] for field in numeric_fields]
+            handles = lines + [plt.Line2D([0], [0], color=color, lw=4, alpha=0.15) for color in self.span_colors]
+            ax.legend(handles, numeric_fields + self.boolean_fields, loc='upper right')
+            self.lines.append(lines)
+        for ax in axes[-1]:
+            ax.set_xlabel("Time (s)")
+        self.axes[0].set_xlim(0, self.time_window)
+
+        # Spans of every boolean field: closed spans as (start, end, artists), open span as (start, artists)
+        self.spans = [[] for _ in self.boolean_fields]
+        self.open_spans = [None]*len(self.boolean_fields)
+
+        self.fig.canvas.mpl_connect('draw_event', self.on_draw)
+
+    def show(self):
+        timer = self.fig.canvas.new_timer(interval=self.update_interval)
+        timer.add_callback(self.update)
+        timer.start()
+        plt.show()
+
+    # A full draw (first draw, resize, limit change) refreshes the background
+    def on_draw(self, event):
+        self.background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        self.draw_animated()
+
+    def get_animated_artists(self):
+        artists = [line for lines in self.lines for line in lines]
+        for j in range(len(self.boolean_fields)):
+            for _, _, span_artists in self.spans[j]:
+                artists += span_artists
+            if self.open_spans[j] is not None:
+                artists += self.open_spans[j][1]
+        return artists
+
+    def draw_animated(self):
+        for artist in self.get_animated_artists():
+            artist.axes.draw_artist(artist)
+
+    # Read the rows written since the previous frame and redraw the animated artists
+    def update(self):
+        rows, self.last_sequence = self.shared_buffer.read_new(self.last_sequence)
+        if len(rows) == 0:
+            return
+        if self.start_time is None:
+            self.start_time = self.shared_buffer.get_column(rows, "timestamp")[0]
+        x_new = self.shared_buffer.get_column(rows, "timestamp") - self.start_time
+        redraw = False
+
+        # Scroll the time axis by half a window once the newest row reaches its end
+        left, right = self.axes[0].get_xlim()
+        if x_new[-1] > right:
+            left, right = x_new[-1] - self.time_window/2, x_new[-1] + self.time_window/2
+            self.axes[0].set_xlim(left, right)
+            self.remove_spans(left)
+            redraw = True
+
+        self.update_spans(x_new, rows)
+
+        # Only the new rows are read from the buffer, the rows that left the window are dropped
+        self.window = np.concatenate([self.window, rows])
+        x_data = self.shared_buffer.get_column(self.window, "timestamp") - self.start_time
+        visible = x_data >= left
+        self.window = self.window[visible]
+        x_data = x_data[visible]
+        for ax, lines, (numeric_fields, _, _) in zip(self.axes, self.lines, self.panels):
+            y_data = [self.shared_buffer.get_column(self.window, field) for field in numeric_fields]
+            for line, y in zip(lines, y_data):
+                line.set_data(x_data, y)
+
+            # Limits grow with the data and are fitted again when the time axis scrolls
+            # A quarter of the range is added as headroom so that the background is not redrawn every frame
+            y_data = np.concatenate(y_data)
+            if len(y_data) == 0 or np.all(np.isnan(y_data)):
+                continue
+            min_y, max_y = np.nanmin(y_data) - 0.5, np.nanmax(y_data) + 0.5
+            bottom, top = ax.get_ylim()
+            if redraw or min_y < bottom or max_y > top:
+                margin = (max_y - min_y)/4
+                ax.set_ylim(min_y - margin, max_y + margin)
+                redraw = True
+
+        if redraw or self.background is None:
+            self.fig.canvas.draw()
+        else:
+            self.fig.canvas.restore_region(self.background)
+            self.draw_animated()
+            self.fig.canvas.blit(self.fig.bbox)
+        self.fig.canvas.flush_events()
+
+    # Extend the open spans, and open or close spans on contact changes
+    def update_spans(self, x_new, rows):
+        for j, field in enumerate(self.boolean_fields):
+            values = self.shared_buffer.get_column(rows, field) == 1
+            for x, value in zip(x_new, values):
+                if value and self.open_spans[j] is None:
+                    self.open_spans[j] = (x, self.create_span(j, x))
+                elif not value and self.open_spans[j] is not None:
+                    start, artists = self.open_spans[j]
+                    self.set_span_end(artists, start, x)
+                    self.spans[j].append((start, x, artists))
+                    self.open_spans[j] = None
+            if self.open_spans[j] is not None:
+                start, artists = self.open_spans[j]
+                self.set_span_end(artists, start, x_new[-1])
+
+    # One rectangle per panel, spanning the full height of the axes
+    def create_span(self, j, start):
+        artists = []
+        for ax in self.axes:
+            span = Rectangle((start, 0), 0, 1, transform=ax.get_xaxis_transform(), color=self.span_colors[j],
+                             alpha=0.15, animated=True)
+            ax.add_patch(span)
+            artists.append(span)
+        return artists
+
+    def set_span_end(self, artists, start, end):
+        for span in artists:
+            span.set_width(end - start)
+
+    # Remove the closed spans that ended before the start of the window
+    def remove_spans(self, left):
+        for j in range(len(self.boolean_fields)):
+            kept = []
+            for start, end, artists in self.spans[j]:
+                if end < left:
+                    for span in artists:
+                        span.remove()
+                else:
+                    kept.append((start, end, artists))
+            self.spans[j] = kept
@@ -0,0 +1,124 @@
+import numpy as np
+from scipy.signal import lfilter
+
+# Gait cycle segmentation shared by the analysis scripts
+# A cycle starts period_offset seconds before a rising edge of the foot contact and ends period_offset seconds
+# before the next rising edge. Cycles are returned as a cycles x samples array padded with NaN.
+
+# Function to compute average time step (dt) from timestamps
+def compute_average_dt(timestamps):
+    return np.mean(np.diff(timestamps))
+
+# Index of the last sample before each contact (transition from False to True)
+def find_rising_edges(foot_contact):
+    foot_contact = np.asarray(foot_contact)
+    return np.flatnonzero((foot_contact[:-1] == False) & (foot_contact[1:] == True))
+
+# Start and end index of every cycle, the cycle after the last rising edge ends period_offset seconds before the end of the log
+# drop_last leaves out the cycle after the last rising edge, clip_start starts the first cycle at 0 if it would start before the log
+# Cycles that still start before the log are dropped, a negative start would slice samples from the end of the log
+def find_cycles(foot_contact, dt, period_offset, clip_start=False, drop_last=False):
+    edges = find_rising_edges(foot_contact)
+    shift = int(period_offset / dt)
+    starts = edges - shift
+    ends = np.append(edges[1:], len(foot_contact) - 1) - shift
+    if drop_last:
+        starts, ends = starts[:-1], ends[:-1]
+    if clip_start:
+        starts = np.maximum(starts, 0)
+    keep = starts >= 0
+    return starts[keep], ends[keep]
+
+# Cut data into a cycles x samples array with a single fancy index, shorter cycles are padded with fill
+def segment_cycles(data, starts, ends, fill=np.nan):
+    data = np.asarray(data, dtype=float)
+    lengths = ends - starts
+    max_length = np.max(lengths) if len(lengths) > 0 else 0
+    samples = np.arange(max_length)
+    idx = np.minimum(starts[:, None] + samples, len(data) - 1)
+    return np.where(samples < lengths[:, None], data[idx], fill)
+
+# Stack arrays of different lengths into a 2-D array, padded at the end with pad_value
+def pad_to_max_length(arrays, pad_value=0):
+    lengths = np.array([len(arr) for arr in arrays])
+    padded = np.full((len(arrays), np.max(lengths)), pad_value, dtype=float)
+    padded[np.arange(padded.shape[1]) < lengths[:, None]] = np.concatenate(arrays)
+    return padded
+
+# NaN-aware reductions, cycle_mean averages over cycles, the others return one value per cycle
+def cycle_mean(cycles):
+    return np.nanmean(cycles, axis=0)
+
+def cycle_max(cycles):
+    return np.nanmax(cycles, axis=1)
+
+def cycle_peak_to_peak(cycles):
+    return np.nanmax(cycles, axis=1) - np.nanmin(cycles, axis=1)
+
+# Exponential moving average along the last axis, y[0] = x[0] and y[i] = (1 - alpha)*y[i-1] + alpha*x[i]
+# lfilter evaluates the same products and sum as a Python loop, so the result is identical
+def ema(data, alpha):
+    data = np.asarray(data, dtype=float)
+    smoothed = data.copy()
+    if data.shape[-1] > 1:
+        smoothed[..., 1:], _ = lfilter([alpha], [1, alpha - 1], data[..., 1:], axis=-1, zi=(1 - alpha)*data[..., :1])
+    return smoothed
+
+# Contact (1) from the first sample where the smoothed pressure rises more than threshold above the first sample,
+# until the first sample where it falls back below. The last sample is never in contact.
+def debounce_foot_contact(data, threshold, alpha=1):
+    debounced = np.zeros(len(data), dtype=int)
+    if len(data) < 2:
+        return debounced
+    rise = ema(data, alpha)
+    rise = rise - rise[0]
+    above = np.flatnonzero(rise[1:] > threshold)
+    if len(above) > 0:
+        start = above[0] + 1
+        below = np.flatnonzero(rise[start + 1:] <= threshold)
+        end = start + 1 + below[0] if len(below) > 0 else len(rise) - 1
+        debounced[start:end] = 1
+    return debounced
+
+# debounce_foot_contact applied to every row of a cycles x samples array, lengths is the number of samples of each cycle
+# threshold is a scalar or one value per cycle, samples after the end of a cycle are set to fill
+# Cycles are debounced in groups of similar length, so that short cycles are not filtered over the padding of long ones
+def debounce_cycles(cycles, lengths, threshold, alpha=1, fill=np.nan):
+    debounced = np.full(np.shape(cycles), fill)
+    threshold = np.broadcast_to(threshold, lengths.shape)
+    groups = np.ceil(np.log2(np.maximum(lengths, 1))).astype(int)
+    for group in np.unique(groups):
+        rows = np.flatnonzero(groups == group)
+        width = np.max(lengths[rows])
+        debounced[rows, :width] = debounce_rows(cycles[rows, :width], lengths[rows], threshold[rows], alpha, fill)
+    return debounced
+
+def debounce_rows(cycles, lengths, threshold, alpha, fill):
+    rise = ema(cycles, alpha)
+    rise = rise - rise[:, :1]
+    threshold = threshold[:, None]
+    samples = np.arange(rise.shape[1])
+    valid = samples < lengths[:, None]
+
+    above = (rise > threshold) & valid & (samples >= 1)
+    start = np.argmax(above, axis=1)
+    below = (rise <= threshold) & valid & (samples > start[:, None])
+    end = np.where(np.any(below, axis=1), np.argmax(below, axis=1), lengths - 1)
+
+    debounced = (samples >= start[:, None]) & (samples < end[:, None]) & np.any(above, axis=1)[:, None]
+    return np.where(valid, debounced, fill)
+
+# Average two signals over all cycles of foot_contact
+# The factor is applied for unit conversion, offset moves both averages to start at 0
+def compute_average_data(timestamps, foot_contact, data1, data2, period_offset, factor=1.0, offset=False):
+    dt = compute_average_dt(timestamps)
+    starts, ends = find_cycles(foot_contact, dt, period_offset)
+
+    avg_data1 = cycle_mean(segment_cycles(data1, starts, ends)) * factor
+    avg_data2 = cycle_mean(segment_cycles(data2, starts, ends)) * factor
+
+    if offset:
+        avg_data1 = avg_data1 - avg_data1[0]
+        avg_data2 = avg_data2 - avg_data2[0]
+
+    return avg_data1, avg_data2, dt
@@ -0,0 +1,119 @@
+import numpy as np
+from HopfNetwork import hopf_derivatives, integrate, get_gait_coupling, INTEGRATORS
+from HopfNetwork import CPG_INITIAL_AMPLITUDE, CPG_INTEGRATOR, CPG_MAX_STEP
+from BatchProcessor import process_items
+from LogReader import read_log
+
+# Offline simulation of many HopfNetwork parameter sets at once, driven by the same foot contact sequence
+# The states of a chunk of parameter sets are stepped together as one chunk x 2 x 4 array, and the metrics are
+# accumulated while stepping, so memory does not grow with the length of the sequence. Chunks can run on worker
+# processes (see BatchProcessor.py).
+#
+# Metrics of each parameter set:
+#   convergence_time  time after which the phase-locking error stays below tolerance, NaN if it never settles
+#   phase_error       RMS difference between the relative phases theta_j - theta_i and the target PHI_ij (rad),
+#                     averaged over the last settle_fraction of the sequence
+#   amplitude         half the peak-to-peak output over the last settle_fraction, averaged over the legs (rad)
+
+NUM_LEGS = 4
+# Parameters of HopfNetwork that can be swept, with their default values
+PARAMETERS = {
+    "mu": 1,
+    "omega_swing": 0.25*2*np.pi,
+    "omega_stance": 0.4*2*np.pi,
+    "alpha": 50,
+    "coupling_strength": 1,
+    "amp_swing": np.pi/4,
+    "amp_stance": np.pi/4,
+}
+METRICS = ["convergence_time", "phase_error", "amplitude"]
+
+# Return every combination of the given parameter values as a dict of flat arrays, one entry per parameter set
+# e.g. make_grid(omega_swing=[1, 2], gait=["TROT", "WALK"]) returns 4 parameter sets
+def make_grid(**values):
+    grid = np.meshgrid(*[np.asarray(v) for v in values.values()], indexing='ij')
+    return {name: g.ravel() for name, g in zip(values.keys(), grid)}
+
+# Foot contact of a gait at a constant period (steps x legs), leg i touches down at F_seq[i] of the period
+def synthetic_foot_contact(num_steps, dt, period=1.0, duty=0.5, F_seq=(0.5, 0, 0, 0.5)):
+    phase = (np.arange(num_steps)[:, None]*dt/period - np.asarray(F_seq)) % 1
+    return phase < duty
+
+# Time step and foot contact (steps x legs) of a recorded log, legs missing from the log are never in contact
+def load_foot_contact(file_name):
+    data = read_log(file_name)
+    dt = np.mean(np.diff(data['timestamp']))
+    foot_contact = np.zeros((len(data), NUM_LEGS), dtype=bool)
+    for i in range(1, NUM_LEGS + 1):
+        if f"foot_contact {i}" in data:
+            foot_contact[:, i-1] = data[f"foot_contact {i}"]
+    return dt, foot_contact
+
+# Return the target phase differences of each parameter set (sets x 4 x 4), from its gait or the default gait
+def get_PHI(params, num_sets):
+    gaits = params.get("gait", np.full(num_sets, "TROT"))
+    PHI = {gait: get_gait_coupling(gait)[0] for gait in np.unique(gaits)}
+    return np.stack([PHI[gait] for gait in gaits])
+
+# Simulate the parameter sets of params (dict of arrays, one entry per set, missing parameters take their default)
+# foot_contact is steps x legs, shared by all sets. Initial amplitudes are r0 and initial phases theta0, the same
+# for all sets. r0 defaults to the initial amplitude of the CPG mode of PAWS. The default phases are drawn at random
+# from seed: the networks of PAWS start at equal phases, an equilibrium of the coupling for the symmetric gaits that
+# only the foot contact moves them off. Each step is integrated as in HopfNetwork.integrate_hopf, with the
+# integrator of the CPG mode of PAWS by default. Returns a dict of metric arrays, one entry per set.
+def simulate_ensemble(params, foot_contact, dt, r0=CPG_INITIAL_AMPLITUDE, theta0=None, seed=0, tolerance=0.1,
+                      settle_fraction=0.25, integrator=CPG_INTEGRATOR, max_step=CPG_MAX_STEP, max_substeps=10):
+    if integrator not in INTEGRATORS:
+        raise ValueError(integrator + ' not implemented.')
+    num_sets = len(next(iter(params.values())))
+    p = {name: np.broadcast_to(params.get(name, default), num_sets)[:, None] for name, default in PARAMETERS.items()}
+    PHI = get_PHI(params, num_sets)
+    W = np.exp(-1j*PHI)
+
+    X = np.zeros((num_sets, 2, NUM_LEGS))
+    X[:, 0, :] = r0
+    X[:, 1, :] = np.random.default_rng(seed).uniform(0, 2*np.pi, NUM_LEGS) if theta0 is None else theta0
+    num_steps = len(foot_contact)
+    settle_step = int(num_steps*(1 - settle_fraction))
+    last_unlocked = np.full(num_sets, -1)
+    phase_error = np.zeros(num_sets)
+    output_min = np.full((num_sets, NUM_LEGS), np.inf)
+    output_max = np.full((num_sets, NUM_LEGS), -np.inf)
+
+    with np.errstate(over='ignore', invalid='ignore'):
+        for k in range(num_steps):
+            derivatives = lambda X: hopf_derivatives(X, foot_contact[k], p["mu"], p["omega_swing"], p["omega_stance"],
+                                                     p["alpha"], p["coupling_strength"], W)
+            X, _ = integrate(X, derivatives, dt, integrator, max_step, max_substeps, p["mu"], p["alpha"])
+
+            # Phase-locking error over the 12 pairs of legs (the diagonal of PHI is zero)
+            z = np.exp(1j*X[:, 1, :])
+            error = np.angle(np.conj(z)[:, :, None]*z[:, None, :]*W)
+            error = np.sqrt(np.sum(error**2, axis=(1, 2))/(NUM_LEGS*(NUM_LEGS - 1)))
+            last_unlocked[~(error < tolerance)] = k
+
+            if k >= settle_step:
+                output = np.where(foot_contact[k], p["amp_stance"], p["amp_swing"])*np.sin(X[:, 1, :])
+                phase_error += error
+                np.minimum(output_min, output, out=output_min)
+                np.maximum(output_max, output, out=output_max)
+
+    convergence_time = np.where(last_unlocked < num_steps - 1, (last_unlocked + 1)*dt, np.nan)
+    return {
+        "convergence_time": convergence_time,
+        "phase_error": phase_error/(num_steps - settle_step),
+        "amplitude": np.mean((output_max - output_min)/2, axis=1),
+    }
+
+def simulate_chunk(chunk, foot_contact, dt, kwargs):
+    return simulate_ensemble(chunk, foot_contact, dt, **kwargs)
+
+# simulate_ensemble over chunks of chunk_size parameter sets, on worker processes (None for one per core)
+# Returns the metrics of all sets in the order of params
+def run_sweep(params, foot_contact, dt, chunk_size=1000, workers=None, progress=True, **kwargs):
+    num_sets = len(next(iter(params.values())))
+    chunks = [{name: values[start:start + chunk_size] for name, values in params.items()}
+              for start in range(0, num_sets, chunk_size)]
+    results = process_items(simulate_chunk, chunks, foot_contact, dt, kwargs, workers=workers, progress=progress,
+                            unit="chunks")
+    return {metric: np.concatenate([result[metric] for result in results]) for metric in METRICS}
@@ -1,8 +1,62 @@
+import copy
 import numpy as np
 
 # CPG in polar coordinates
 # Leg Order is FR, FL, RR, RL
 
+# EULER and RK4 integrate amplitudes and phases together, EXACT uses the closed-form solution of the amplitude
+# equation and advances the phases at the rate of the start of each substep (exact for locked phases)
+INTEGRATORS = ["EULER", "RK4", "EXACT"]
+
+# Initial amplitude of the networks of the CPG mode of PAWS, also the default of the parameter sweeps (HopfEnsemble.py)
+# An oscillator at r = 0 stays there, and the coupling is weighted by the amplitudes, so it has no effect at r = 0
+CPG_INITIAL_AMPLITUDE = 0.1
+# Integrator of the CPG mode of PAWS, also the default of the parameter sweeps. At the 100 Hz loop rate of the run
+# scripts, benchmark_integrator.py picks RK4 without substeps as the cheapest integrator within 0.01 rad of phase error:
+# EULER and EXACT need substeps of 2 ms and less to get there, which costs more. Its picks at 200 Hz (EXACT with 5 ms
+# substeps) and 500 Hz (EULER) apply when TIMESTEP is changed. The 20 ms substeps only split ticks stretched by overruns.
+CPG_INTEGRATOR = "RK4"
+CPG_MAX_STEP = 0.02
+
+# Footfall sequence of each gait, leg i touches down at F_seq[i] of the period
+GAITS = {
+    "TROT": [0.5, 0, 0, 0.5],
+    "PACE": [0.5, 0, 0.5, 0],
+    "BOUND": [0.5, 0.5, 0, 0],
+    "WALK": [0.5, 0, 0.25, 0.75],
+    "CUSTOM": [1, 0, 1, 0],
+}
+# REWRITE but with FR RR FL RL
+# F_seq_trot = np.array([0.5, 0, 0.5, 0])
+# F_seq_pace = np.array([0.5, 0, 0, 0.5])
+# F_seq_bound = np.array([0.5, 0.5, 0, 0])
+# F_seq_walk = np.array([0.5, 0, 0.25, 0.75])
+
+# Phase differences PHI[i, j] = 2*pi*(F_seq[i] - F_seq[j]) of a footfall sequence
+def calculate_PHI(F_seq):
+    F_seq = np.asarray(F_seq, dtype=float)
+    return 2*np.pi*np.subtract.outer(F_seq, F_seq)
+
+# Coupling matrices (PHI, W = exp(-i PHI)) of the registered gaits, computed once
+GAIT_COUPLING = {}
+
+# Register a gait by name so that switching to it does not compute its coupling matrices again
+def register_gait(name, F_seq):
+    PHI = calculate_PHI(F_seq)
+    GAIT_COUPLING[name] = (PHI, np.exp(-1j*PHI))
+
+# Return (PHI, W) of a registered gait name or of a footfall sequence
+def get_gait_coupling(gait):
+    if isinstance(gait, str):
+        if gait not in GAIT_COUPLING:
+            raise ValueError(gait + ' not implemented.')
+        return GAIT_COUPLING[gait]
+    PHI = calculate_PHI(gait)
+    return PHI, np.exp(-1j*PHI)
+
+for name, F_seq in GAITS.items():
+    register_gait(name, F_seq)
+
 class HopfNetwork:
     def __init__(self,
                  mu = 1**2,                 # intrisic amplitude
@@ -14,7 +68,12 @@ class HopfNetwork:
                  couple = True,             # True if oscillators should be coupled
                  dt=0.03,                  # time step
                  amp_swing = np.pi/4,        # desired amplitude in swing phase
-                 amp_stance = np.pi/4):      # desired amplitude in stance phase
+                 amp_stance = np.pi/4,       # desired amplitude in stance phase
+                 batch_size = None,         # number of independent networks stepped together, None for a single network
+                 integrator = "EULER",      # integration method, see INTEGRATORS
+                 max_step = None,           # longest integration substep (s), None for one substep per update
+                 max_substeps = 10,         # bound on the substeps per update, longer substeps are taken beyond
+                 r0 = 0):                   # initial amplitude of all oscillators
     
         print("Creating Hopf Network...")
         self.mu = mu
@@ -24,112 +83,148 @@ class HopfNetwork:
         self.coupling_strength = coupling_strength
         self.couple = couple
         self.dt = dt
-        self.gait = gait
+        self.PHI = None
+        print("Setting gait to: ", gait)
         self.set_gait(gait)
         self.amp_swing = amp_swing
         self.amp_stance = amp_stance
+        if integrator not in INTEGRATORS:
+            raise ValueError(integrator + ' not implemented.')
+        self.integrator = integrator
+        self.max_step = max_step
+        self.max_substeps = max_substeps
+        self.last_timestamp = None
 
         # Construct state variables (CPG amplicudes r at row 0 and CPG phases theta at row 1)
-        self.X = np.zeros((2, 4))
-        self.X_dot = np.zeros((2, 4))
-
-    def calculate_PHI(self, F_seq):
-        PHI = np.zeros((4,4))
-        for i in range(len(F_seq)):
-            for j in range(len(F_seq)):
-                PHI[i][j] = (F_seq[i] - F_seq[j])*2*np.pi
-        return PHI
-  
-    def set_gait(self,gait):
-
-        print("Setting gait to: ", gait)
-
-        F_seq_trot = np.array([0.5, 0, 0, 0.5])
-        F_seq_pace = np.array([0.5, 0, 0.5, 0])
-        F_seq_bound = np.array([0.5, 0.5, 0, 0])
-        F_seq_walk = np.array([0.5, 0, 0.25, 0.75])
-        F_seq_custom = np.array([1, 0, 1, 0])
-        # REWRITE but with FR RR FL RL
-        # F_seq_trot = np.array([0.5, 0, 0.5, 0])
-        # F_seq_pace = np.array([0.5, 0, 0, 0.5])
-        # F_seq_bound = np.array([0.5, 0.5, 0, 0])
-        # F_seq_walk = np.array([0.5, 0, 0.25, 0.75])
-
-        self.PHI_trot = self.calculate_PHI(F_seq_trot)
-        self.PHI_pace = self.calculate_PHI(F_seq_pace)
-        self.PHI_bound = self.calculate_PHI(F_seq_bound)
-        self.PHI_walk = self.calculate_PHI(F_seq_walk)
-        self.PHI_custom = self.calculate_PHI(F_seq_custom)
-
-        if gait == "TROT":
-            self.PHI = self.PHI_trot
-        elif gait == "PACE":
-            self.PHI = self.PHI_pace
-        elif gait == "BOUND":
-            self.PHI = self.PHI_bound
-        elif gait == "WALK":
-            self.PHI = self.PHI_walk
-        elif gait == "CUSTOM":
-            self.PHI = self.PHI_custom
+        # With a batch size, the states of the networks are stacked along a leading axis and foot contact is batch x 4
+        shape = (2, 4) if batch_size is None else (batch_size, 2, 4)
+        self.X = np.zeros(shape)
+        self.X[..., 0, :] = r0
+        self.X_dot = np.zeros(shape)
+
+    # Switch to a registered gait or to a gait given by its F_seq, in constant time
+    # With a transition window (s), the phase differences are interpolated from the current ones to the new ones
+    # along the shortest way around the circle, as the network is advanced
+    def set_gait(self, gait, transition=0):
+        PHI, W = get_gait_coupling(gait)
+        self.gait = gait
+        if transition > 0 and self.PHI is not None:
+            self.PHI_start = self.PHI
+            self.PHI_change = np.angle(np.conj(W)*np.exp(-1j*self.PHI))
+            self.target = PHI, W
+            self.transition = transition
+            self.transition_time = 0
         else:
-            raise ValueError( gait + ' not implemented.')
-        
-    def update(self, foot_contact):
-        self.integrate_hopf(foot_contact)
-        cmd_angle = np.zeros(4)
-
-        for i in range(4):
-            if (foot_contact[i] == True):
-                cmd_angle[i] = self.amp_stance * np.sin(self.get_theta()[i])
-            else:
-                cmd_angle[i] = self.amp_swing * np.sin(self.get_theta()[i])
-
-    
-        return cmd_angle
-
-
-
+            self.PHI = PHI
+            self.W = W
+            self.transition_time = self.transition = 0
+
+    # Interpolate the coupling matrices over the transition window
+    def advance_transition(self, elapsed):
+        self.transition_time = min(self.transition_time + elapsed, self.transition)
+        if self.transition_time < self.transition:
+            self.PHI = self.PHI_start + self.transition_time/self.transition*self.PHI_change
+            self.W = np.exp(-1j*self.PHI)
+        else:
+            self.PHI, self.W = self.target
+
+    # Advance the network by the time elapsed since the previous update, or by dt when no timestamp is given
+    def update(self, foot_contact, timestamp=None):
+        self.integrate_hopf(foot_contact, self.get_elapsed(timestamp))
+        amp = np.where(foot_contact, self.amp_stance, self.amp_swing)
+        return amp * np.sin(self.get_theta())
+
+    # Commands of every sample of a whole sequence (samples x legs, or samples x batch x legs), the same as calling
+    # update on each sample. The network is integrated on a copy, so the sequence starts from the current state
+    # and leaves it unchanged. Integration is sequential in time, the commands are computed for all samples at once.
+    def evaluate(self, foot_contact, timestamps=None):
+        foot_contact = np.asarray(foot_contact)
+        network = copy.copy(self)
+        theta = np.zeros(np.broadcast_shapes(foot_contact.shape, (len(foot_contact),) + self.get_theta().shape))
+        for k in range(len(foot_contact)):
+            network.integrate_hopf(foot_contact[k], network.get_elapsed(None if timestamps is None else timestamps[k]))
+            theta[k] = network.get_theta()
+        return np.where(foot_contact, self.amp_stance, self.amp_swing)*np.sin(theta)
 
     # Get CPG amplitudes (r)
     def get_r(self):
-        return self.X[0, :]
+        return self.X[..., 0, :]
     
     # Get CPG phases (theta)
     def get_theta(self):
-        return self.X[1, :]
+        return self.X[..., 1, :]
     
     # Get CPG amplitudes derivatives
     def get_r_dot(self):
-        return self.X_dot[0, :]
+        return self.X_dot[..., 0, :]
     
     # Get CPG phases derivatives
     def get_theta_dot(self):
-        return self.X_dot[1, :]
+        return self.X_dot[..., 1, :]
     
-    def integrate_hopf(self, foot_contact):
-        X = self.X.copy()
-        X_dot = self.X_dot.copy()
-
-        for i in range(4):
-            r, theta = self.get_r()[i], self.get_theta()[i]
-            r_dot = self.alpha*(self.mu - r**2)*r
-
-            if foot_contact[i]:
-                theta_dot = self.omega_stance
-            else:
-                theta_dot = self.omega_swing
-            
-            if self.couple:
-                theta_dot += self.coupling_strength*np.sum(self.get_r()*np.sin(self.get_theta() - theta - self.PHI[i, :]))
-
-            #print theta_dot and i
-            # print(theta_dot, i)             
-            X_dot[:, i] = [r_dot, theta_dot]
-
-            # Integrate
-            self.X = X + self.dt*X_dot
-            self.X_dot = X_dot
-
-
-
-            self.X[1, :] = np.mod(self.X[1, :], 2*np.pi)
+    # Time since the previous timestamp, the first update does not advance the network
+    def get_elapsed(self, timestamp):
+        if timestamp is None:
+            return self.dt
+        elapsed = 0 if self.last_timestamp is None else timestamp - self.last_timestamp
+        self.last_timestamp = timestamp
+        return elapsed
+
+    def get_derivatives(self, X, foot_contact):
+        return hopf_derivatives(X, foot_contact, self.mu, self.omega_swing, self.omega_stance, self.alpha,
+                                self.coupling_strength, self.W if self.couple else None)
+
+    # Integrate all oscillators over elapsed seconds (dt by default), foot contact is held over the interval
+    # The interval is split into substeps of at most max_step seconds, at most max_substeps of them
+    def integrate_hopf(self, foot_contact, elapsed=None):
+        if elapsed is None:
+            elapsed = self.dt
+        if self.transition_time < self.transition:
+            self.advance_transition(elapsed)
+        self.X, self.X_dot = integrate(self.X, lambda X: self.get_derivatives(X, foot_contact), elapsed,
+                                       self.integrator, self.max_step, self.max_substeps, self.mu, self.alpha)
+
+# Integrate network states X over elapsed seconds, derivatives(X) returns the derivatives of a state
+# The interval is split into substeps of at most max_step seconds (one substep when max_step is None), at most
+# max_substeps of them. EXACT uses the amplitude parameters mu and alpha. Returns the new state, with the phases
+# wrapped to [0, 2*pi), and the derivatives at the start of the last substep.
+def integrate(X, derivatives, elapsed, integrator="EULER", max_step=None, max_substeps=10, mu=None, alpha=None):
+    num_substeps = 1
+    if max_step is not None:
+        num_substeps = int(min(max(np.ceil(elapsed/max_step), 1), max_substeps))
+    h = elapsed/num_substeps
+
+    for _ in range(num_substeps):
+        X_dot = derivatives(X)
+        if integrator == "RK4":
+            k2 = derivatives(X + h/2*X_dot)
+            k3 = derivatives(X + h/2*k2)
+            k4 = derivatives(X + h*k3)
+            X = X + h/6*(X_dot + 2*k2 + 2*k3 + k4)
+        elif integrator == "EXACT":
+            r = X[..., 0, :]
+            X = X + h*X_dot
+            X[..., 0, :] = exact_amplitude(r, mu, alpha, h)
+        else:
+            X = X + h*X_dot
+    X[..., 1, :] = np.mod(X[..., 1, :], 2*np.pi)
+    return X, X_dot
+
+# Amplitude after h seconds of r_dot = alpha*(mu - r^2)*r, from the logistic solution of u = r^2
+def exact_amplitude(r, mu, alpha, h):
+    u = r**2
+    return np.sqrt(mu*u/(u + (mu - u)*np.exp(-2*alpha*mu*h)))
+
+# Derivatives of the amplitudes (row 0) and phases (row 1) of networks with state X of shape (..., 2, 4)
+# foot_contact is (..., 4), the parameters are scalars or arrays broadcasting against (..., 4)
+# The coupling of oscillator i is sum_j r_j sin(theta_j - theta_i - PHI_ij) = Im(exp(-i theta_i) sum_j W_ij r_j exp(i theta_j))
+# with W = exp(-i PHI), a single matrix product for all oscillators. No coupling when W is None.
+def hopf_derivatives(X, foot_contact, mu, omega_swing, omega_stance, alpha, coupling_strength, W):
+    r, theta = X[..., 0, :], X[..., 1, :]
+    X_dot = np.empty(np.broadcast_shapes(X.shape, np.shape(foot_contact)[:-1] + (2, 4)))
+    X_dot[..., 0, :] = alpha*(mu - r**2)*r
+    X_dot[..., 1, :] = np.where(foot_contact, omega_stance, omega_swing)
+    if W is not None:
+        z = np.exp(1j*theta)
+        X_dot[..., 1, :] += coupling_strength*np.imag(np.conj(z)*(W @ (r*z)[..., None])[..., 0])
+    return X_dot
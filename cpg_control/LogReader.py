@@ -0,0 +1,82 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+
+# Reader and converters for the logs written by DataLogger
+# A binary log is a .bin file of fixed-size records described by a .json header with the same base name
+
+def get_header_name(file_name):
+    return os.path.splitext(file_name)[0] + '.json'
+
+class BinaryLog:
+    def __init__(self, file_name):
+        self.file_name = os.path.splitext(file_name)[0] + '.bin'
+        with open(get_header_name(file_name), 'r') as f:
+            self.header = json.load(f)
+        self.fields = self.header["fields"]
+        self.decimals = dict(zip(self.fields, self.header["decimals"]))
+        self.dtype = np.dtype([(field, dtype) for field, dtype in zip(self.fields, self.header["formats"])])
+
+        # Records are memory-mapped, columns are views into the file
+        # A partially written last record is ignored
+        num_records = os.path.getsize(self.file_name) // self.dtype.itemsize
+        if num_records > 0:
+            self.data = np.memmap(self.file_name, dtype=self.dtype, mode='r', shape=(num_records,))
+        else:
+            self.data = np.zeros(0, dtype=self.dtype)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, field):
+        return self.data[field]
+
+    def __contains__(self, field):
+        return field in self.fields
+
+    @property
+    def columns(self):
+        return self.fields
+
+    def to_dataframe(self):
+        return pd.DataFrame({field: np.asarray(self.data[field]) for field in self.fields})
+
+# Read a CSV or binary log into a DataFrame with the CSV column layout
+def read_log(file_name):
+    if os.path.splitext(file_name)[1] in ['.bin', '.json']:
+        return BinaryLog(file_name).to_dataframe()
+    return pd.read_csv(file_name)
+
+# Convert a CSV log to the binary format, boolean columns are stored as booleans and all others as float64
+def csv_to_binary(csv_file, bin_file=None, decimals=4):
+    if bin_file is None:
+        bin_file = os.path.splitext(csv_file)[0] + '.bin'
+    data = pd.read_csv(csv_file, float_precision='round_trip')
+    fields = list(data.columns)
+    formats = ['?' if data[field].dtype == bool else 'f8' for field in fields]
+    records = np.zeros(len(data), dtype=np.dtype(list(zip(fields, formats))))
+    for field in fields:
+        records[field] = data[field].values
+
+    header = {
+        "fields": fields,
+        "formats": formats,
+        "decimals": [None if field == "timestamp" or dtype == '?' else decimals for field, dtype in zip(fields, formats)],
+    }
+    with open(get_header_name(bin_file), 'w') as f:
+        json.dump(header, f, indent=2)
+    records.tofile(bin_file)
+    return bin_file
+
+# Convert a binary log to the CSV format written by DataLogger
+def binary_to_csv(bin_file, csv_file=None):
+    if csv_file is None:
+        csv_file = os.path.splitext(bin_file)[0] + '.csv'
+    log = BinaryLog(bin_file)
+    data = log.to_dataframe()
+    for field in log.fields:
+        if log.decimals[field] is not None:
+            data[field] = data[field].round(log.decimals[field])
+    data.to_csv(csv_file, index=False)
+    return csv_file
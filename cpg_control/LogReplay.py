@@ -0,0 +1,156 @@
+import glob
+import os
+import time
+import numpy as np
+import pandas as pd
+from PAWS import PAWS, LUT_MODES
+from LogReader import read_log
+
+# Replay recorded pressure logs through the PAWS command stage, without hardware or asyncio sleeps
+# The command of tick k is computed from the pressure replied at tick k-1, as in PAWS.update
+
+TRN_TO_RAD = 2*np.pi
+NUM_CONTROLLERS = 4
+REPLAY_DIR = "replay"
+
+# Modes whose commands can be evaluated for a whole log in one pass, SINE and CPG also need the timestamps
+BATCH_MODES = LUT_MODES + ["PASSIVE", "STIFF", "SINE", "CPG"]
+
+# Load timestamps and pressure readings (samples x controllers) of a recorded CSV or binary log
+# Returns the ids of the controllers found in the log, pressure of missing controllers is zero (no contact)
+def load_log(file_name):
+    data = read_log(file_name)
+    timestamps = data['timestamp'].values.astype(float)
+    pressure = np.zeros((len(data), NUM_CONTROLLERS))
+    controller_ids = []
+    for i in range(1, NUM_CONTROLLERS + 1):
+        if f"pressure {i}" in data:
+            pressure[:, i-1] = data[f"pressure {i}"].values
+            controller_ids.append(i)
+    return timestamps, pressure, controller_ids
+
+# Step a PAWS instance through the log one tick at a time
+# Returns foot contact, position commands (turns) and torque limits, all samples x controllers
+# The foot contact thresholds of calibration_file are used when it is set
+def replay_log(timestamps, pressure, mode, controller_ids=[1, 2, 3, 4], calibration_file=None, **paws_kwargs):
+    paws = PAWS(mode=mode, controller_ids=controller_ids, verbose=False, **paws_kwargs)
+    if calibration_file is not None:
+        paws.load_contact_calibration(calibration_file)
+    num_samples = len(timestamps)
+    foot_contact = np.zeros((num_samples, NUM_CONTROLLERS), dtype=bool)
+    positions = np.zeros((num_samples, NUM_CONTROLLERS))
+    torques = np.zeros((num_samples, NUM_CONTROLLERS))
+
+    for k in range(num_samples):
+        paws.update_contact_state(timestamps[k])
+        position, max_torque = paws.get_commands(timestamps[k])
+        for i in controller_ids:
+            positions[k, i-1], torques[k, i-1], _ = paws.get_controller_command(i, position, max_torque)
+        foot_contact[k] = paws.foot_contact
+
+        # Pressure replied to the commands of this tick
+        paws.pressure[:] = pressure[k]
+
+    return foot_contact, positions, torques
+
+# Evaluate the commands of a whole log in one vectorized pass (modes in BATCH_MODES only)
+# Returns the same arrays as replay_log, foot contact goes through the contact detector of PAWS (contact_* arguments
+# and calibration_file), a minimum dwell time also needs the timestamps
+def evaluate_log(pressure, mode, controller_ids=[1, 2, 3, 4], max_torque=3, once=False, initial_jumps=0,
+                 timestamps=None, calibration_file=None, **paws_kwargs):
+    if mode not in BATCH_MODES:
+        raise ValueError(mode + ' cannot be evaluated in batch.')
+    if mode in ["SINE", "CPG"] and timestamps is None:
+        raise ValueError(mode + ' needs the timestamps of the log.')
+    paws = PAWS(mode=mode, controller_ids=controller_ids, max_torque=max_torque, once=once,
+                initial_jumps=initial_jumps, verbose=False, **paws_kwargs)
+    if calibration_file is not None:
+        paws.load_contact_calibration(calibration_file)
+    num_samples = len(pressure)
+    idx = np.asarray(controller_ids) - 1
+
+    # Foot contact of tick k is computed from the pressure of tick k-1, tick 0 from the initial pressure of PAWS
+    rows = np.vstack([paws.pressure, pressure[:-1]])
+    foot_contact = np.zeros((num_samples, NUM_CONTROLLERS), dtype=bool)
+    foot_contact[:, idx] = paws.contact_detector.evaluate(rows, timestamps)[:, idx]
+
+    if mode in LUT_MODES:
+        weights = 2**np.arange(NUM_CONTROLLERS - 1, -1, -1)
+        positions = paws.LUT[foot_contact @ weights].astype(float)
+        torques = np.where(positions != 0, max_torque, 0.0)
+    elif mode == "STIFF":
+        positions = np.tile([1, 0, 0.01, 0], (num_samples, 1)).astype(float)
+        torques = np.where(positions != 0, max_torque, 0.0)
+    elif mode == "SINE":
+        positions = paws.sine.evaluate(foot_contact, timestamps)
+        torques = np.full((num_samples, NUM_CONTROLLERS), float(max_torque))
+    elif mode == "CPG":
+        positions = paws.hopf.evaluate(foot_contact, timestamps)
+        torques = np.where(positions != 0, max_torque, 0.0)
+    else:
+        positions = np.zeros((num_samples, NUM_CONTROLLERS))
+        torques = np.zeros((num_samples, NUM_CONTROLLERS))
+
+    # Jumps are counted on rising edges of the FR foot contact
+    jumps = np.cumsum(np.diff(foot_contact[:, 0].astype(int), prepend=0) == 1)
+    torques[jumps < initial_jumps] = 0
+    if once:
+        positions[jumps > initial_jumps + 3] = 0
+        torques[jumps > initial_jumps + 3] = 0
+
+    # Controllers that are not driven receive no command
+    unused = np.setdiff1d(np.arange(NUM_CONTROLLERS), idx)
+    positions[:, unused] = 0
+    torques[:, unused] = 0
+    return foot_contact, positions, torques
+
+# Write a command sequence with the same column naming as the recorded logs (positions in rad)
+def write_commands(file_name, timestamps, foot_contact, positions, torques, controller_ids):
+    data = {"timestamp": timestamps}
+    for i in controller_ids:
+        data["foot_contact " + str(i)] = foot_contact[:, i-1]
+        data["command_position " + str(i)] = np.round(positions[:, i-1]*TRN_TO_RAD, 4)
+        data["max_torque " + str(i)] = torques[:, i-1]
+    pd.DataFrame(data).to_csv(file_name, index=False)
+
+# Return the recorded logs (CSV files with pressure readings) in a directory
+def find_logs(directory="."):
+    logs = []
+    for file_name in sorted(glob.glob(os.path.join(directory, "*.csv"))):
+        with open(file_name, 'r') as f:
+            if "pressure 1" in f.readline():
+                logs.append(file_name)
+    return logs
+
+# Evaluate every LUT mode against every recorded log
+# The command sequences of all modes are written to one compressed archive per log in REPLAY_DIR
+def main():
+    os.makedirs(REPLAY_DIR, exist_ok=True)
+    logs = find_logs()
+    start = time.perf_counter()
+    switches = {mode: 0 for mode in LUT_MODES}
+    active = {mode: 0 for mode in LUT_MODES}
+    num_samples = 0
+
+    for file_name in logs:
+        timestamps, pressure, controller_ids = load_log(file_name)
+        num_samples += len(timestamps)
+        commands = {"timestamp": timestamps, "controller_ids": controller_ids}
+        for mode in LUT_MODES:
+            foot_contact, positions, torques = evaluate_log(pressure, mode, controller_ids=controller_ids)
+            switches[mode] += np.count_nonzero(np.any(np.diff(positions, axis=0) != 0, axis=1))
+            active[mode] += np.count_nonzero(np.any(torques != 0, axis=1))
+            commands["foot_contact"] = foot_contact
+            commands[mode + "_position"] = positions
+            commands[mode + "_max_torque"] = torques
+        name = os.path.splitext(os.path.basename(file_name))[0] + ".npz"
+        np.savez_compressed(os.path.join(REPLAY_DIR, name), **commands)
+
+    elapsed = time.perf_counter() - start
+    print(f"Replayed {len(logs)} logs ({num_samples} ticks) in {len(LUT_MODES)} modes in {elapsed:.2f} s")
+    print(f"{'mode':<20}{'command switches':>18}{'active ticks [%]':>18}")
+    for mode in LUT_MODES:
+        print(f"{mode:<20}{switches[mode]:>18}{100*active[mode]/max(num_samples, 1):>18.1f}")
+
+if __name__ == "__main__":
+    main()
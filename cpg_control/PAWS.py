@@ -1,11 +1,56 @@
 import moteus
 import asyncio
+import os
+import time
 import numpy as np
-from HopfNetwork import HopfNetwork
+from HopfNetwork import HopfNetwork, CPG_INITIAL_AMPLITUDE, CPG_INTEGRATOR, CPG_MAX_STEP
 from SineNetwork import SineNetwork
+from CommandModes import LUTCommand, ConstantCommand, CPGCommand, SineCommand, get_contact_weights
+from ContactDetector import ContactDetector
+from ContactCalibration import RunningStats, CALIBRATION_FILE, get_contact_thresholds, save_calibration, load_calibration
 
 LUT_MODES = ["AMPLIFY", "AMPLIFY_FROM_DATA", "AMPLIFY_SPEED", "AMPLIFY_CUSTOM", "JUMP", "JUMP2", "JUMP3", "CUSTOM", "LOAD", "PERTURBATION", "PERTURBATION_LOAD"]
 
+# SEQUENTIAL awaits one round trip per command, BATCHED sends every command of a tick in a single transport cycle
+UPDATE_MODES = ["SEQUENTIAL", "BATCHED"]
+
+# CONTROL only returns pressure and position at reduced resolution, LOGGING returns every logged register
+# DECIMATED queries the CONTROL profile on every tick and the LOGGING profile every query_decimation ticks
+QUERY_PROFILES = ["CONTROL", "LOGGING", "DECIMATED"]
+
+# Registers read by the control scripts, registers that were not queried yet read NaN
+LOGGED_REGISTERS = [moteus.Register.POSITION, moteus.Register.COMMAND_POSITION, moteus.Register.VELOCITY,
+                    moteus.Register.TORQUE, moteus.Register.POWER, moteus.Register.MOTOR_TEMPERATURE]
+
+# ALWAYS recaptures every commanded leg on every tick, ON_CHANGE only when its target or the foot contact state changes
+RECAPTURE_MODES = ["ALWAYS", "ON_CHANGE"]
+
+# Return the query resolution of a query profile
+# Analog pressure sensor is connected to motor temperature input, INT16 resolves 0.1 and position 0.0001 turns
+def make_query_resolution(profile):
+    qr = moteus.QueryResolution()
+    if profile == "CONTROL":
+        qr.position = moteus.INT16
+        qr.velocity = moteus.IGNORE
+        qr.torque = moteus.IGNORE
+        qr.motor_temperature = moteus.INT16
+        qr.voltage = moteus.IGNORE
+        qr.temperature = moteus.IGNORE
+        qr._extra = {}
+    elif profile == "LOGGING":
+        qr.position = moteus.F32
+        qr.velocity = moteus.F32
+        qr.torque = moteus.F32
+        # used for power estimation
+        qr.power = moteus.F32
+        qr.motor_temperature = moteus.F32
+        qr._extra = {
+            moteus.Register.COMMAND_POSITION: moteus.F32,
+        }
+    else:
+        raise ValueError(profile + ' not implemented.')
+    return qr
+
 class PAWS:
     def __init__(self,
                  mode = "AMPLIFY",
@@ -17,11 +62,27 @@ class PAWS:
                  once = False,
                  initial_jumps = 0,
                  sync_pressure = True,
-                 period = 1
+                 period = 1,
+                 update_mode = "SEQUENTIAL",
+                 profiler = None,
+                 backend = None,
+                 verbose = True,
+                 recapture_mode = "ALWAYS",
+                 query_profile = "LOGGING",
+                 query_decimation = 10,
+                 contact_alpha = 1,
+                 contact_hysteresis = 0,
+                 contact_min_dwell = 0
                  ):
         self.num_controllers = 4
         self.foot_contact_thr = np.array([103, 104, 103.5, 104])
-        self.foot_contact = np.array([False, False, False, False])
+        # Foot contact is debounced with an EMA of the pressure (contact_alpha), a hysteresis band of contact_hysteresis
+        # analog units centred on foot_contact_thr and a minimum time of contact_min_dwell seconds between transitions
+        # The defaults compare the raw pressure to foot_contact_thr
+        self.contact_detector = ContactDetector(self.foot_contact_thr + contact_hysteresis/2,
+                                                self.foot_contact_thr - contact_hysteresis/2,
+                                                alpha=contact_alpha, min_dwell=contact_min_dwell)
+        self.foot_contact = self.contact_detector.contact
         self.pressure = np.zeros(self.num_controllers)
         self.power = np.zeros(self.num_controllers)
         self.mode = mode
@@ -30,24 +91,53 @@ class PAWS:
         self.velocity_limit = velocity_limit
         self.max_torque = max_torque
         self.controller_ids = controller_ids
+        self.controller_idx = np.asarray(controller_ids) - 1
+        self.contact_weights = get_contact_weights(self.num_controllers)
         self.LUT = np.zeros((2**self.num_controllers, self.num_controllers))
         self.jump_counts = 0
         self.once = once
         self.initial_jumps = initial_jumps
+        self.verbose = verbose
         if self.mode in LUT_MODES:
             self.set_LUT()
         if self.mode == "CPG":
-            self.hopf = HopfNetwork()
+            # Advanced by the time between updates, see CPG_INTEGRATOR for the choice of the integrator
+            self.hopf = HopfNetwork(integrator=CPG_INTEGRATOR, max_step=CPG_MAX_STEP, r0=CPG_INITIAL_AMPLITUDE)
         if self.mode == "SINE":
             self.sine = SineNetwork(sync_pressure=sync_pressure, period=period)
+        self.command = self.create_command()
         self.states = [None, None, None, None]
+        if update_mode not in UPDATE_MODES:
+            raise ValueError(update_mode + ' not implemented.')
+        self.update_mode = update_mode
+        # Optional TickProfiler, phase boundaries are only marked when it is set
+        self.profiler = profiler
+        # Controller backend (e.g. SimBackend), moteus controllers on the CAN bus are used when None
+        self.backend = backend
+        if recapture_mode not in RECAPTURE_MODES:
+            raise ValueError(recapture_mode + ' not implemented.')
+        self.recapture_mode = recapture_mode
+        self.last_position = np.full(self.num_controllers, np.nan)
+        self.contact_changed = True
+        self.num_ticks = 0
+        self.sent_recaptures = 0
+        self.saved_transactions = 0         # recaptures skipped since the start
+        self.tick_saved_transactions = 0    # recaptures skipped during the last tick
+        if query_profile not in QUERY_PROFILES:
+            raise ValueError(query_profile + ' not implemented.')
+        self.query_profile = query_profile
+        self.query_decimation = query_decimation
+        self.query_override = None
+        # Last known value of each logged register, kept across ticks that do not query it
+        self.values = [dict.fromkeys(LOGGED_REGISTERS, np.nan) for _ in range(self.num_controllers)]
 
     # Set LUT
     # Rows represent the foot contact state and columns represent the controllers
     # Each entry in the LUT is the position command for the corresponding controller
     # Order is FR, FL, RR, RL
     def set_LUT(self):
-        print("Setting LUT for mode: ", self.mode)
+        if self.verbose:
+            print("Setting LUT for mode: ", self.mode)
         if self.mode == "AMPLIFY":              
 
             #                    Commanded positions   Foot contact states
@@ -358,26 +448,36 @@ class PAWS:
 
     # Get index for LUT based on foot contact.
     def get_LUT_index(self):
-        idx = 0
-        for i in range(self.num_controllers):
-            idx += self.foot_contact[i]*2**(self.num_controllers-i-1)
-        return idx
+        return int(np.dot(self.foot_contact, self.contact_weights))
+
+    # Select the command stage of the mode, called once at construction
+    def create_command(self):
+        if self.mode in LUT_MODES:
+            return LUTCommand(self.LUT, self.max_torque)
+        elif self.mode == "CPG":
+            return CPGCommand(self.hopf, self.max_torque)
+        elif self.mode == "SINE":
+            return SineCommand(self.sine, self.max_torque, self.num_controllers)
+        elif self.mode == "STIFF":
+            return ConstantCommand([1, 0, 0.01, 0], self.max_torque)
+        elif self.mode == "PASSIVE":
+            return ConstantCommand(np.zeros(self.num_controllers), 0)
+        else:
+            print("Mode not supported. Not setting commands.")
+            return ConstantCommand(np.zeros(self.num_controllers), 0)
 
     # Create and initialize the controllers with the extra fields
     async def create_controllers(self):
-        self.qr = moteus.QueryResolution()
-        self.qr._extra = {
-            moteus.Register.MOTOR_TEMPERATURE: moteus.F32,
-            moteus.Register.POSITION: moteus.F32,
-            moteus.Register.COMMAND_POSITION: moteus.F32,
-            moteus.Register.VELOCITY: moteus.F32,
-            moteus.Register.TORQUE: moteus.F32,
-            # used for power estimation
-            moteus.Register.POWER: moteus.F32,
-        }
+        self.qr = make_query_resolution("LOGGING" if self.query_profile == "LOGGING" else "CONTROL")
+        self.full_qr = make_query_resolution("LOGGING")
 
-        # Create a list of moteus controllers
-        self.controllers = [moteus.Controller(id=i + 1, query_resolution=self.qr) for i in range(self.num_controllers)]
+        # Create a list of controllers sharing a single transport, so that commands can be batched
+        if self.backend is None:
+            self.transport = moteus.get_singleton_transport()
+            self.controllers = [moteus.Controller(id=i + 1, query_resolution=self.qr, transport=self.transport) for i in range(self.num_controllers)]
+        else:
+            self.transport = self.backend.create_transport()
+            self.controllers = [self.backend.create_controller(i + 1, self.qr, self.transport) for i in range(self.num_controllers)]
 
         # Ensure all controllers are stopped
         for controller in self.controllers:
@@ -389,84 +489,191 @@ class PAWS:
             # await self.controllers[i-1].set_output_exact(position=0)
             await self.controllers[i-1].set_output_nearest(position=0)
 
-    # Convert pressure values to foot contact boolean values
-    def update_foot_contact(self):
-        for i in self.controller_ids:
-            if self.pressure[i-1] > self.foot_contact_thr[i-1]:
-                self.foot_contact[i-1] = True
-            else:
-                self.foot_contact[i-1] = False
-
-    # Return commands for the controllers according to selected mode
-    def get_commands(self):
-        if self.mode == "PASSIVE":
-            return np.zeros(self.num_controllers), 0
-        elif self.mode in LUT_MODES:
-            return self.LUT[self.get_LUT_index()], self.max_torque
-        else:
-            print("Mode not supported. Not setting commands.")
-            return np.zeros(self.num_controllers), 0
-    
+    # Set the foot contact thresholds of a calibration file, or calibrate them and save them if there is none
+    # The pressure is sampled for duration seconds with the feet unloaded, then loaded, prompt waits for the operator
+    async def calibrate_contact(self, file_name=CALIBRATION_FILE, recalibrate=False, duration=3, timestep=0.01, prompt=input):
+        if recalibrate or not os.path.exists(file_name):
+            prompt("Lift the robot so that the feet are unloaded, then press Enter")
+            unloaded = await self.sample_pressure(duration, timestep)
+            prompt("Put the robot down so that the feet are loaded, then press Enter")
+            loaded = await self.sample_pressure(duration, timestep)
+            rising_thr, falling_thr = get_contact_thresholds(unloaded, loaded, self.controller_idx)
+            save_calibration(file_name, self.controller_ids, unloaded, loaded, rising_thr, falling_thr)
+            print("Saved foot contact calibration to " + file_name)
+        self.load_contact_calibration(file_name)
+
+    # Set the foot contact thresholds of a calibration file
+    def load_contact_calibration(self, file_name=CALIBRATION_FILE):
+        rising_thr, falling_thr = load_calibration(file_name, self.foot_contact_thr)
+        self.foot_contact_thr[:] = (rising_thr + falling_thr)/2
+        self.contact_detector.set_thresholds(rising_thr, falling_thr)
+        if self.verbose:
+            print("Foot contact thresholds: rising", rising_thr[self.controller_idx], "falling", falling_thr[self.controller_idx])
+
+    # Query the pressure of all controllers every timestep seconds for duration seconds
+    # Returns the running statistics of every leg
+    async def sample_pressure(self, duration, timestep):
+        stats = RunningStats(self.num_controllers)
+        pressure = np.zeros(self.num_controllers)
+        end = time.monotonic() + duration
+        while time.monotonic() < end:
+            results = await self.transport.cycle([self.controllers[i-1].make_query() for i in self.controller_ids])
+            for result in results:
+                if result.id in self.controller_ids:
+                    pressure[result.id - 1] = result.values[moteus.Register.MOTOR_TEMPERATURE]
+            stats.add(pressure)
+            await asyncio.sleep(timestep)
+        return stats
+
+    # Convert pressure values to foot contact boolean values, foot_contact is updated in place
+    # Legs without a controller read zero pressure and stay out of contact
+    def update_foot_contact(self, timestamp=None):
+        if timestamp is None:
+            timestamp = time.time()
+        self.contact_detector.update(self.pressure, timestamp)
+
+    # Return position commands for all legs and the torque limit according to selected mode
+    # The returned array is reused by the command stage on the next tick
+    def get_commands(self, timestamp=None):
+        return self.command.update(self.foot_contact, timestamp)
+
+    # Return (position, maximum torque, recapture) sent to controller i
+    # Legs without a position command are left passive and do not need a recapture
+    def get_controller_command(self, i, position, max_torque):
+        recapture = True
+        if position[i-1] == 0 and self.mode != "SINE":
+            max_torque = 0
+            recapture = False
+
+        if self.jump_counts < self.initial_jumps:
+            max_torque = 0
+
+        if self.once:
+            if self.jump_counts > self.initial_jumps + 3:
+                # print("going back to passive mode")
+                return 0, 0, recapture
+
+        return position[i-1], max_torque, recapture
+
+    # Return True if the recapture requested for controller i has to be sent this tick
+    # In ON_CHANGE mode it is skipped while the target of the controller and the foot contact state stay the same
+    def filter_recapture(self, i, position, recapture):
+        changed = self.contact_changed or position != self.last_position[i-1]
+        self.last_position[i-1] = position
+        if not recapture:
+            return False
+        if self.recapture_mode == "ON_CHANGE" and not changed:
+            self.tick_saved_transactions += 1
+            self.saved_transactions += 1
+            return False
+        self.sent_recaptures += 1
+        return True
+
+    def print_statistics(self):
+        print(f"Recaptures: {self.sent_recaptures} sent, {self.saved_transactions} CAN transactions saved "
+              f"({self.saved_transactions/max(self.num_ticks, 1):.2f} per tick over {self.num_ticks} ticks)")
+        idx = self.controller_idx
+        print(f"Foot contact transitions: {self.contact_detector.transitions[idx]} accepted, "
+              f"{self.contact_detector.get_suppressed_transitions()[idx]} suppressed")
+
     def get_state(self):
         return self.states, self.foot_contact
 
+    # Store a controller reply and update its pressure value
+    # Analog pressure sensor is connected to motor temperature input
+    # Registers missing from a reduced query keep their last known value
+    def set_state(self, i, state):
+        if self.query_profile != "LOGGING":
+            self.values[i-1] = {**self.values[i-1], **state.values}
+            state.values = self.values[i-1]
+        self.states[i-1] = state
+        self.pressure[i-1] = state.values[moteus.Register.MOTOR_TEMPERATURE]
+
+    # Return the query resolution overriding the controllers' default this tick, None to use the default
+    def get_query_override(self):
+        if self.query_profile == "DECIMATED" and (self.num_ticks - 1) % self.query_decimation == 0:
+            return self.full_qr
+        return None
+
+    # Update foot contact from the last pressure readings and count jumps
+    def update_contact_state(self, timestamp=None):
+        self.update_foot_contact(timestamp)
+        changed = self.contact_detector.changed
+        self.contact_changed = changed.any()
+        if self.profiler is not None:
+            self.profiler.mark("foot_contact")
+
+        if changed[0] and self.foot_contact[0]:
+            self.jump_counts += 1
+            if self.verbose:
+                print("Jump counts: ", self.jump_counts)
+
     # Send commands to the controllers
     async def update(self, timestamp):
+        self.update_contact_state(timestamp)
+        self.num_ticks += 1
+        self.tick_saved_transactions = 0
+        self.query_override = self.get_query_override()
 
-        # Update foot contact
-        prev_foot_contact = self.foot_contact.copy()
-        self.update_foot_contact()
+        if self.update_mode == "BATCHED":
+            await self.update_batched(timestamp)
+        else:
+            await self.update_sequential(timestamp)
 
-        if prev_foot_contact[0] == False and self.foot_contact[0] == True:
-            self.jump_counts += 1
-            print("Jump counts: ", self.jump_counts)
+    # Send commands one controller at a time, waiting for each reply
+    async def update_sequential(self, timestamp):
+        # Get commands
+        position, max_torque = self.get_commands(timestamp)
+        if self.profiler is not None:
+            self.profiler.mark("commands")
 
         for i in self.controller_ids:
-            position = np.zeros(self.num_controllers)
-            # Get commands
-            if self.mode in LUT_MODES:
-                position, max_torque = self.get_commands()
-            elif self.mode == "CPG":
-                position = self.hopf.update(self.foot_contact)
-                max_torque = self.max_torque
-            elif self.mode == "PASSIVE":
-                position = [0, 0, 0, 0]
-            elif self.mode == "SINE":
-                position = self.sine.update(self.foot_contact, timestamp)
-                max_torque = self.max_torque
-            elif self.mode == "STIFF":
-                position = [1, 0, 0.01, 0]
-                max_torque = self.max_torque
-            
-            if position[i-1] == 0 and self.mode != "SINE":
-                max_torque = 0
+            controller_position, controller_torque, recapture = self.get_controller_command(i, position, max_torque)
 
-            else:
+            if self.filter_recapture(i, controller_position, recapture):
                 await self.controllers[i-1].set_recapture_position_velocity()
 
-            if self.jump_counts < self.initial_jumps:
-                max_torque = 0
-
-            if self.once:
-                if self.jump_counts > self.initial_jumps + 3:
-                    # print("going back to passive mode")
-                    position = [0, 0, 0, 0]
-                    max_torque = 0
-
-            self.states[i-1] = await self.controllers[i-1].set_position(
-                position=position[i-1],
+            state = await self.controllers[i-1].set_position(
+                position=controller_position,
                 velocity=0,
                 velocity_limit=self.velocity_limit,
                 accel_limit=self.accel_limit,
-                maximum_torque=max_torque,
-                query=True
+                maximum_torque=controller_torque,
+                query=True,
+                query_override=self.query_override
             )
+            self.set_state(i, state)
 
-            # Update pressure values. Analog pressure sensor is connected to motor temperature input
-            self.pressure[i-1] = self.states[i-1].values[moteus.Register.MOTOR_TEMPERATURE]
+        if self.profiler is not None:
+            self.profiler.mark("can")
 
+    # Send the commands of all controllers in a single transport cycle
+    # Replies are matched back to their controller using the source id
+    async def update_batched(self, timestamp):
+        position, max_torque = self.get_commands(timestamp)
 
+        commands = []
+        for i in self.controller_ids:
+            controller_position, controller_torque, recapture = self.get_controller_command(i, position, max_torque)
 
+            if self.filter_recapture(i, controller_position, recapture):
+                commands.append(self.controllers[i-1].make_recapture_position_velocity())
 
-        
-        
\ No newline at end of file
+            commands.append(self.controllers[i-1].make_position(
+                position=controller_position,
+                velocity=0,
+                velocity_limit=self.velocity_limit,
+                accel_limit=self.accel_limit,
+                maximum_torque=controller_torque,
+                query=True,
+                query_override=self.query_override
+            ))
+        if self.profiler is not None:
+            self.profiler.mark("commands")
+
+        results = await self.transport.cycle(commands)
+        for result in results:
+            if result.id in self.controller_ids:
+                self.set_state(result.id, result)
+        if self.profiler is not None:
+            self.profiler.mark("can")
@@ -0,0 +1,84 @@
+import asyncio
+import time
+import numpy as np
+
+# CATCH_UP runs late ticks back to back until the schedule is met again, unless more than max_catch_up deadlines
+# have passed (e.g. after a GC pause or a slow first CAN transaction), then the backlog is skipped as with SKIP
+# SKIP drops the missed deadlines and resumes on the next one in the future
+OVERRUN_POLICIES = ["CATCH_UP", "SKIP"]
+
+class FixedRateScheduler:
+    def __init__(self, period, policy="SKIP", history=10000, max_catch_up=3):
+        if policy not in OVERRUN_POLICIES:
+            raise ValueError(policy + ' not implemented.')
+        self.period = period
+        self.policy = policy
+        self.max_catch_up = max_catch_up
+        self.history = history
+        self.jitter = np.zeros(history)     # wake-up time minus deadline of the last ticks (s)
+        self.num_ticks = 0
+        self.missed_deadlines = 0
+        self.skipped_ticks = 0
+        self.start_time = None
+        self.next_deadline = None
+
+    # Start the schedule, the first deadline is one period from now
+    def start(self):
+        self.start_time = time.monotonic()
+        self.next_deadline = self.start_time + self.period
+
+    # Wait until the next deadline on the monotonic clock
+    async def wait(self):
+        if self.next_deadline is None:
+            self.start()
+
+        deadline = self.next_deadline
+        now = time.monotonic()
+
+        if now > deadline:
+            self.missed_deadlines += 1
+            missed = int((now - deadline) // self.period) + 1
+            if self.policy == "SKIP" or missed > self.max_catch_up:
+                # Move to the first deadline still ahead of us
+                self.skipped_ticks += missed
+                deadline += missed*self.period
+                await asyncio.sleep(deadline - now)
+            else:
+                # Run immediately without sleeping
+                await asyncio.sleep(0)
+        else:
+            await asyncio.sleep(deadline - now)
+
+        self.jitter[self.num_ticks % self.history] = time.monotonic() - deadline
+        self.num_ticks += 1
+        self.next_deadline = deadline + self.period
+
+    # Return the jitter of the last ticks in chronological order
+    def get_jitter(self):
+        if self.num_ticks < self.history:
+            return self.jitter[:self.num_ticks].copy()
+        idx = self.num_ticks % self.history
+        return np.concatenate((self.jitter[idx:], self.jitter[:idx]))
+
+    def get_statistics(self):
+        jitter = self.get_jitter()
+        stats = {
+            "ticks": self.num_ticks,
+            "missed_deadlines": self.missed_deadlines,
+            "skipped_ticks": self.skipped_ticks,
+            "mean_jitter": 0.0,
+            "p99_jitter": 0.0,
+            "max_jitter": 0.0,
+        }
+        if len(jitter) > 0:
+            stats["mean_jitter"] = np.mean(jitter)
+            stats["p99_jitter"] = np.percentile(jitter, 99)
+            stats["max_jitter"] = np.max(jitter)
+        return stats
+
+    def print_statistics(self):
+        stats = self.get_statistics()
+        print(f"Scheduler: {stats['ticks']} ticks at {1/self.period:.0f} Hz, "
+              f"{stats['missed_deadlines']} missed deadlines, {stats['skipped_ticks']} skipped ticks")
+        print(f"Jitter: mean {stats['mean_jitter']*1e3:.3f} ms, "
+              f"p99 {stats['p99_jitter']*1e3:.3f} ms, max {stats['max_jitter']*1e3:.3f} ms")
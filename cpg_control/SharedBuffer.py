@@ -0,0 +1,83 @@
+import numpy as np
+from multiprocessing import shared_memory
+
+# Ring buffer in shared memory, written by the control loop and read by the plotting processes
+# The first 8 bytes hold the number of rows written so far (sequence counter), followed by capacity x fields float64 values
+# Booleans are stored as 0/1
+
+HEADER_SIZE = 8
+
+class SharedRingBuffer:
+    def __init__(self, fields, capacity=1000, name=None, create=True):
+        self.fields = list(fields)
+        self.field_index = {field: i for i, field in enumerate(self.fields)}
+        self.capacity = capacity
+        size = HEADER_SIZE + capacity*len(self.fields)*8
+        if create:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        else:
+            self.shm = attach_shared_memory(name)
+        self.name = self.shm.name
+        self.owner = create
+
+        self.sequence = np.ndarray((1,), dtype=np.int64, buffer=self.shm.buf)
+        self.data = np.ndarray((capacity, len(self.fields)), dtype=np.float64, buffer=self.shm.buf, offset=HEADER_SIZE)
+        self.row = np.full(len(self.fields), np.nan)
+        if create:
+            self.sequence[0] = 0
+
+    # Attach to a buffer created by another process
+    @classmethod
+    def attach(cls, name, fields, capacity):
+        return cls(fields, capacity, name=name, create=False)
+
+    # Return the arguments needed to attach to this buffer from another process
+    def get_spec(self):
+        return (self.name, self.fields, self.capacity)
+
+    # Same interface as DataLogger, the row is published by write_line
+    def set_field(self, field_name, value):
+        self.row[self.field_index[field_name]] = value
+
+    # Publish the current row, the counter is incremented after the row is copied
+    def write_line(self):
+        self.data[self.sequence[0] % self.capacity] = self.row
+        self.sequence[0] += 1
+
+    def get_sequence(self):
+        return int(self.sequence[0])
+
+    # Return the last n rows (at most capacity) in chronological order, with the sequence number of the newest row
+    def get_latest(self, n):
+        sequence = self.get_sequence()
+        return self.read_rows(sequence - min(n, sequence, self.capacity), sequence), sequence
+
+    # Return the rows written after the given sequence number and the current sequence number
+    # Rows that were already overwritten are skipped
+    def read_new(self, last_sequence):
+        sequence = self.get_sequence()
+        return self.read_rows(max(last_sequence, sequence - self.capacity), sequence), sequence
+
+    # Copy the rows with sequence numbers start to end - 1, without the ones the writer overwrote during the copy
+    # The row being written when the counter is read again is that counter minus capacity, it is dropped as well
+    def read_rows(self, start, end):
+        rows = self.data[np.arange(start, end) % self.capacity]
+        oldest = self.get_sequence() - self.capacity + 1
+        return rows[max(oldest - start, 0):]
+
+    def get_column(self, rows, field_name):
+        return rows[:, self.field_index[field_name]]
+
+    def close(self):
+        del self.sequence, self.data
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+# Attach to an existing shared memory block, only its creator removes it
+# Before Python 3.13 the block cannot be untracked, which is harmless for processes started with fork
+def attach_shared_memory(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
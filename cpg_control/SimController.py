@@ -0,0 +1,289 @@
+import asyncio
+import math
+import time
+import moteus
+import numpy as np
+
+# In-process stand-in for moteus controllers, used to run PAWS without a CAN adapter and motors
+# Replies use the same values[moteus.Register.*] layout as moteus results
+
+# Registers reported for the standard query resolution fields
+QR_REGISTERS = {
+    "mode": moteus.Register.MODE,
+    "position": moteus.Register.POSITION,
+    "velocity": moteus.Register.VELOCITY,
+    "torque": moteus.Register.TORQUE,
+    "power": moteus.Register.POWER,
+    "motor_temperature": moteus.Register.MOTOR_TEMPERATURE,
+    "voltage": moteus.Register.VOLTAGE,
+    "temperature": moteus.Register.TEMPERATURE,
+    "fault": moteus.Register.FAULT,
+}
+
+# Simulated bus waits (s), see SimTransport.wait_bus
+LOOP_RESOLUTION = 0.001     # resolution of the event loop timers
+SLEEP_STEP = 0.0001         # longest sleep that blocks the event loop
+SPIN_TIME = 0.0002          # last part of a wait that is spun, short sleeps overshoot by tens of microseconds
+
+# Bytes per register value and register scaling of the integer resolutions (INT8, INT16, INT32)
+RESOLUTION_BYTES = {moteus.INT8: 1, moteus.INT16: 2, moteus.INT32: 4, moteus.F32: 4}
+REGISTER_SCALES = {
+    moteus.Register.POSITION: (0.01, 0.0001, 0.00001),
+    moteus.Register.VELOCITY: (0.1, 0.00025, 0.00001),
+    moteus.Register.TORQUE: (0.5, 0.01, 0.001),
+    moteus.Register.POWER: (10.0, 0.05, 0.0001),
+    moteus.Register.MOTOR_TEMPERATURE: (1.0, 0.1, 0.001),
+    moteus.Register.COMMAND_POSITION: (0.01, 0.0001, 0.00001),
+    moteus.Register.VOLTAGE: (0.5, 0.1, 0.001),
+    moteus.Register.TEMPERATURE: (1.0, 0.1, 0.001),
+}
+REPLY_HEADER_BYTES = 3
+
+SUPPLY_VOLTAGE = 24
+BOARD_TEMPERATURE = 30
+POSITION_TIME_CONSTANT = 0.05   # time constant of the simulated position loop (s)
+STIFFNESS = 5                   # simulated torque per turn of position error (Nm/rev)
+
+# Return a scripted pressure signal: a square wave between low and high with additive Gaussian noise
+# Phase is the fraction of the period by which the contact is delayed
+def square_pressure(period=1, duty=0.5, phase=0, low=100, high=106, noise=0.2, seed=None):
+    rng = np.random.default_rng(seed)
+    def pressure(t):
+        in_contact = ((t/period - phase) % 1) < duty
+        return (high if in_contact else low) + noise*rng.standard_normal()
+    return pressure
+
+# Return a scripted pressure signal replaying recorded samples (e.g. a "pressure N" column of a log)
+def recorded_pressure(timestamps, values, loop=True):
+    timestamps = np.asarray(timestamps, dtype=float) - timestamps[0]
+    values = np.asarray(values, dtype=float)
+    duration = timestamps[-1]
+    def pressure(t):
+        if loop and duration > 0:
+            t = t % duration
+        return np.interp(t, timestamps, values)
+    return pressure
+
+# Return the queried registers and their resolution
+def get_query_registers(qr):
+    registers = {register: getattr(qr, field) for field, register in QR_REGISTERS.items() if getattr(qr, field) != moteus.IGNORE}
+    registers.update({register: resolution for register, resolution in qr._extra.items() if resolution != moteus.IGNORE})
+    return registers
+
+# Return the approximate size in bytes of a reply to a query
+def get_reply_size(qr):
+    return REPLY_HEADER_BYTES + sum(RESOLUTION_BYTES[resolution] for resolution in get_query_registers(qr).values())
+
+# Round a value to the resolution it is transmitted with
+def quantize(register, resolution, value):
+    if resolution == moteus.F32 or register not in REGISTER_SCALES or np.isnan(value):
+        return value
+    scale = REGISTER_SCALES[register][resolution]
+    return round(value/scale)*scale
+
+class SimResult:
+    def __init__(self, id, values):
+        self.id = id
+        self.arbitration_id = id << 8
+        self.bus = None
+        self.values = values
+
+    def __repr__(self):
+        return f'{self.id}/{self.values}'
+
+class SimCommand:
+    def __init__(self, destination, reply_required, apply, reply_size=0):
+        self.destination = destination
+        self.reply_required = reply_required
+        self.apply = apply
+        self.reply_size = reply_size
+
+class SimTransport:
+    def __init__(self, latency=0.0005, frame_time=0.0001, byte_time=0.0000016):
+        self.latency = latency          # simulated round trip overhead per transport cycle (s)
+        self.frame_time = frame_time    # simulated bus time per frame (s)
+        self.byte_time = byte_time      # simulated bus time per reply byte (s), 5 Mbps CAN-FD data phase by default
+        self.start_time = time.monotonic()
+        self.num_cycles = 0
+        self.num_frames = 0
+        self.num_reply_bytes = 0
+
+    # Simulation time since the transport was created
+    def get_time(self):
+        return time.monotonic() - self.start_time
+
+    # Wait for the simulated bus time, yielding to the event loop
+    # Event loop timers have a resolution of a millisecond, whole milliseconds are slept on the event loop and the
+    # rest in steps of at most SLEEP_STEP seconds with a yield between them, only the last SPIN_TIME seconds are spun
+    async def wait_bus(self, num_frames, num_bytes):
+        target = time.perf_counter() + self.latency + num_frames*self.frame_time + num_bytes*self.byte_time
+        remaining = target - time.perf_counter()
+        if remaining > 2*LOOP_RESOLUTION:
+            await asyncio.sleep(math.floor(remaining/LOOP_RESOLUTION - 1)*LOOP_RESOLUTION)
+        await asyncio.sleep(0)
+        while True:
+            remaining = target - time.perf_counter()
+            if remaining <= 0:
+                break
+            if remaining > SPIN_TIME:
+                time.sleep(min(remaining - SPIN_TIME, SLEEP_STEP))
+            await asyncio.sleep(0)
+
+    async def cycle(self, commands):
+        self.num_cycles += 1
+        num_bytes = sum(command.reply_size for command in commands)
+        self.num_frames += len(commands)
+        self.num_reply_bytes += num_bytes
+        await self.wait_bus(len(commands), num_bytes)
+
+        t = self.get_time()
+        results = []
+        for command in commands:
+            result = command.apply(t)
+            if command.reply_required:
+                results.append(result)
+        return results
+
+class SimController:
+    def __init__(self, id=1, query_resolution=moteus.QueryResolution(), transport=None, pressure=None):
+        self.id = id
+        self.query_resolution = query_resolution
+        self.transport = transport if transport is not None else SimTransport()
+        self.pressure = pressure if pressure is not None else square_pressure(phase=0.25*(id-1), seed=id)
+
+        self.mode = moteus.Mode.STOPPED
+        self.position = 0.0
+        self.velocity = 0.0
+        self.torque = 0.0
+        self.command_position = np.nan
+        self.maximum_torque = 0.0
+        self.velocity_limit = np.inf
+        self.last_time = None
+        self.travel = 0.0
+        self.impulse = 0.0
+        self.interval = 0.0
+
+    # Advance the simulated joint to time t
+    # Travel and torque are accumulated over the integration intervals, replies report their average since the
+    # previous reply. A recapture resets the position error, so the instantaneous values of the short interval
+    # between a recapture and the following position command would read zero on every tick.
+    def step(self, t):
+        dt = 0 if self.last_time is None else t - self.last_time
+        self.last_time = t
+        if dt <= 0:
+            return
+        self.interval += dt
+
+        if self.mode != moteus.Mode.POSITION or self.maximum_torque == 0 or np.isnan(self.command_position):
+            return
+
+        error = self.command_position - self.position
+        velocity = np.clip(error/POSITION_TIME_CONSTANT, -self.velocity_limit, self.velocity_limit)
+        self.position += velocity*dt
+        self.travel += velocity*dt
+        self.impulse += np.clip(STIFFNESS*error, -self.maximum_torque, self.maximum_torque)*dt
+
+    # Set the reported velocity and torque to their average since the previous reply
+    def update_averages(self):
+        if self.interval > 0:
+            self.velocity = self.travel/self.interval
+            self.torque = self.impulse/self.interval
+            self.travel = self.impulse = self.interval = 0.0
+
+    def get_values(self, t, query_resolution=None):
+        qr = query_resolution if query_resolution is not None else self.query_resolution
+        self.update_averages()
+        available = {
+            moteus.Register.MODE: int(self.mode),
+            moteus.Register.POSITION: self.position,
+            moteus.Register.VELOCITY: self.velocity,
+            moteus.Register.TORQUE: self.torque,
+            moteus.Register.POWER: self.torque*self.velocity*2*np.pi,
+            moteus.Register.MOTOR_TEMPERATURE: self.pressure(t),
+            moteus.Register.COMMAND_POSITION: self.command_position,
+            moteus.Register.VOLTAGE: SUPPLY_VOLTAGE,
+            moteus.Register.TEMPERATURE: BOARD_TEMPERATURE,
+            moteus.Register.FAULT: 0,
+        }
+        return {register: quantize(register, resolution, available[register])
+                for register, resolution in get_query_registers(qr).items() if register in available}
+
+    def make_command(self, query, query_override, action=None):
+        def apply(t):
+            self.step(t)
+            if action is not None:
+                action()
+            if query or query_override is not None:
+                return SimResult(self.id, self.get_values(t, query_override))
+            return None
+        reply_required = query or query_override is not None
+        reply_size = 0
+        if reply_required:
+            reply_size = get_reply_size(query_override if query_override is not None else self.query_resolution)
+        return SimCommand(self.id, reply_required, apply, reply_size)
+
+    async def execute(self, command):
+        results = await self.transport.cycle([command])
+        return results[0] if results else None
+
+    def make_query(self, query_override=None):
+        return self.make_command(True, query_override)
+
+    def make_stop(self, query=False, query_override=None):
+        def action():
+            self.mode = moteus.Mode.STOPPED
+            self.command_position = np.nan
+        return self.make_command(query, query_override, action)
+
+    def make_set_output(self, position=0.0, query=False, query_override=None):
+        def action():
+            self.position = position
+        return self.make_command(query, query_override, action)
+
+    def make_recapture_position_velocity(self, query=False, query_override=None):
+        def action():
+            self.command_position = self.position
+        return self.make_command(query, query_override, action)
+
+    def make_position(self, position=None, velocity=None, velocity_limit=None, accel_limit=None, maximum_torque=None,
+                      query=False, query_override=None, **kwargs):
+        def action():
+            self.mode = moteus.Mode.POSITION
+            if position is not None:
+                self.command_position = position
+            self.maximum_torque = maximum_torque if maximum_torque is not None else np.inf
+            self.velocity_limit = velocity_limit if velocity_limit is not None else np.inf
+        return self.make_command(query, query_override, action)
+
+    async def query(self, **kwargs):
+        return await self.execute(self.make_query(**kwargs))
+
+    async def set_stop(self, **kwargs):
+        return await self.execute(self.make_stop(**kwargs))
+
+    async def set_output_nearest(self, **kwargs):
+        return await self.execute(self.make_set_output(**kwargs))
+
+    async def set_output_exact(self, **kwargs):
+        return await self.execute(self.make_set_output(**kwargs))
+
+    async def set_recapture_position_velocity(self, **kwargs):
+        return await self.execute(self.make_recapture_position_velocity(**kwargs))
+
+    async def set_position(self, **kwargs):
+        return await self.execute(self.make_position(**kwargs))
+
+# Controller backend for PAWS creating simulated controllers on a shared simulated bus
+# pressure maps controller ids to scripted pressure signals, unlisted ids use a default square wave
+class SimBackend:
+    def __init__(self, latency=0.0005, frame_time=0.0001, byte_time=0.0000016, pressure=None):
+        self.latency = latency
+        self.frame_time = frame_time
+        self.byte_time = byte_time
+        self.pressure = pressure if pressure is not None else {}
+
+    def create_transport(self):
+        return SimTransport(latency=self.latency, frame_time=self.frame_time, byte_time=self.byte_time)
+
+    def create_controller(self, id, query_resolution, transport):
+        return SimController(id=id, query_resolution=query_resolution, transport=transport, pressure=self.pressure.get(id))
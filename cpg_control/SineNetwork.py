@@ -3,9 +3,12 @@ import numpy as np
 DEG_TO_TRN = 1/360
 # AMPLIFIER = 6
 AMPLIFIER = 20
+# Samples per period of the trajectory tables, linear interpolation between them is within 1e-5 turns
+TABLE_SIZE = 1024
 
 class SineNetwork:
-    def __init__(self, amp=None, omega=None, theta=None, offset=None, t_off=None, sync_pressure = True, period = 1):
+    def __init__(self, amp=None, omega=None, theta=None, offset=None, t_off=None, sync_pressure = True, period = 1,
+                 table_size = TABLE_SIZE, debug = False, debug_interval = 0.5):
         if amp is None:
             # amp = [AMPLIFIER*29*DEG_TO_TRN, 0*DEG_TO_TRN, AMPLIFIER*30*DEG_TO_TRN, 0*DEG_TO_TRN] # 1
             amp = [AMPLIFIER*0*DEG_TO_TRN, 0*DEG_TO_TRN, AMPLIFIER*30*DEG_TO_TRN, 0*DEG_TO_TRN] # 1
@@ -46,10 +49,33 @@ class SineNetwork:
         self.sync_pressure = sync_pressure
         self.period = period
         self.previous_foot_contact = False
+        self.debug = debug
+        self.debug_interval = debug_interval
+        self.last_debug_time = -np.inf
+        self.build_tables(table_size)
+
+    # Tabulate one period of each leg's trajectory, offset - amp*sin(2*pi*u + theta) + amp*sin(theta) for u in [0, 1]
+    # The tables of all legs are laid end to end, so that one np.interp call reads every leg. The trajectory is at
+    # the offset at both ends of the period, so clipping the table position holds the legs there outside of it.
+    # Call again after changing amp, omega, theta, offset or t_off.
+    def build_tables(self, table_size=TABLE_SIZE):
+        amp, theta = np.asarray(self.amp, dtype=float)[:, None], np.asarray(self.theta, dtype=float)[:, None]
+        u = np.linspace(0, 1, table_size)
+        self.tables = (np.asarray(self.offset, dtype=float)[:, None] - amp*np.sin(2*np.pi*u + theta)
+                       + amp*np.sin(theta)).ravel()
+        self.table_index = np.arange(len(self.tables), dtype=float)
+        self.table_max = table_size - 1
+        self.rows = np.arange(len(self.amp))*table_size
+
+        # Position of each leg in the tables is tau*slope + start, held between the first and last sample of its table
+        self.slope = np.asarray(self.omega, dtype=float)/(2*np.pi)*self.table_max
+        self.start = self.rows - np.asarray(self.t_off, dtype=float)*self.slope
+        self.first = self.rows.astype(float)
+        self.last = self.first + self.table_max
+        self.position = np.zeros(len(self.amp))
+        self.cmd_angle = np.zeros(len(self.amp))
 
     def update(self, foot_contact, timestamp):
-        cmd_angle = np.zeros(4)
-
         if self.sync_pressure:
             if foot_contact[2] and not self.previous_foot_contact:
                 self.t_start = timestamp
@@ -59,18 +85,45 @@ class SineNetwork:
 
         self.previous_foot_contact = foot_contact[2]
 
-        if self.t_start is not None:
-            t = timestamp
-            for i in range(4):
-                period = (2 * np.pi) / self.omega[i] if self.omega[i] != 0 else np.inf
-                if t - self.t_start < self.t_off[i]:
-                    cmd_angle[i] = 0
-                elif t - self.t_start <= period + self.t_off[i]:
-                    cmd_angle[i] = (-self.amp[i] * np.sin(self.omega[i] * (t - self.t_start - self.t_off[i]) + self.theta[i])
-                                    + self.amp[i] * np.sin(self.theta[i]))
-                else:
-                    cmd_angle[i] = 0
-
-                cmd_angle[i] += self.offset[i]
-        print(cmd_angle)
-        return cmd_angle
+        np.multiply(timestamp - self.t_start, self.slope, out=self.position)
+        self.cmd_angle[:] = self.interpolate(self.position)
+        if self.debug and timestamp - self.last_debug_time >= self.debug_interval:
+            self.last_debug_time = timestamp
+            print(self.cmd_angle)
+        return self.cmd_angle
+
+    # Commands of every sample of a whole sequence (samples x legs), the same as calling update on each sample
+    # foot_contact is samples x legs, the sequence starts from the current state, which is left unchanged
+    def evaluate(self, foot_contact, timestamps):
+        timestamps = np.asarray(timestamps, dtype=float)
+        return self.lookup(timestamps - self.get_start_times(foot_contact, timestamps))
+
+    # Start time of the period at every sample
+    # Periods restart on rising edges of foot contact 3 with sync_pressure, otherwise on the first sample more than
+    # period seconds after the start, which is found with one search per period
+    def get_start_times(self, foot_contact, timestamps):
+        if self.sync_pressure:
+            contact = np.asarray(foot_contact)[:, 2].astype(bool)
+            rising = contact & ~np.concatenate([[self.previous_foot_contact], contact[:-1]]).astype(bool)
+            last_rising = np.maximum.accumulate(np.where(rising, np.arange(len(timestamps)), -1))
+            return np.where(last_rising >= 0, timestamps[np.maximum(last_rising, 0)], self.t_start)
+
+        start_times = np.full(len(timestamps), float(self.t_start))
+        t_start = self.t_start
+        k = np.searchsorted(timestamps, t_start + self.period, side='right')
+        while k < len(timestamps):
+            t_start = timestamps[k]
+            start_times[k:] = t_start
+            k = np.searchsorted(timestamps, t_start + self.period, side='right')
+        return start_times
+
+    # Commands of all legs at times tau since the start of the period (any shape, legs along a new last axis)
+    # Outside of [t_off, t_off + 2*pi/omega] the legs stay at their offset
+    def lookup(self, tau):
+        return self.interpolate(np.multiply(np.expand_dims(tau, -1), self.slope))
+
+    def interpolate(self, position):
+        position += self.start
+        np.maximum(position, self.first, out=position)
+        np.minimum(position, self.last, out=position)
+        return np.interp(position, self.table_index, self.tables)
@@ -0,0 +1,66 @@
+import time
+import numpy as np
+
+# Phases of a control tick, in the order in which they are marked
+TICK_PHASES = ["foot_contact", "commands", "can", "log_fields", "write_line"]
+
+class TickProfiler:
+    def __init__(self, phases=TICK_PHASES, capacity=10000):
+        self.phases = list(phases)
+        self.phase_index = {phase: i + 1 for i, phase in enumerate(self.phases)}
+        self.capacity = capacity
+
+        # Ring buffer of phase boundary timestamps, column 0 is the start of the tick
+        self.timestamps = np.full((capacity, len(self.phases) + 1), np.nan)
+        self.row = self.timestamps[0]
+        self.num_ticks = 0
+
+    # Mark the start of a new tick
+    def start_tick(self):
+        self.row = self.timestamps[self.num_ticks % self.capacity]
+        self.row.fill(np.nan)
+        self.row[0] = time.perf_counter()
+
+    # Mark the end of a phase
+    def mark(self, phase):
+        self.row[self.phase_index[phase]] = time.perf_counter()
+
+    # Mark the end of the tick
+    def end_tick(self):
+        self.num_ticks += 1
+
+    # Return the duration of each phase for the completed ticks (ticks x phases, in seconds)
+    # Phases that were not marked during a tick have a duration of zero
+    def get_durations(self):
+        if self.num_ticks < self.capacity:
+            timestamps = self.timestamps[:self.num_ticks]
+        else:
+            idx = self.num_ticks % self.capacity
+            timestamps = np.concatenate((self.timestamps[idx:], self.timestamps[:idx]))
+        timestamps = np.fmax.accumulate(timestamps, axis=1)
+        return np.diff(timestamps, axis=1)
+
+    # Return p50, p99 and max duration of each phase (in seconds)
+    def get_summary(self):
+        durations = self.get_durations()
+        durations = np.column_stack((durations, np.sum(durations, axis=1)))
+        summary = {}
+        if len(durations) == 0:
+            return summary
+        p50 = np.percentile(durations, 50, axis=0)
+        p99 = np.percentile(durations, 99, axis=0)
+        peak = np.max(durations, axis=0)
+        for i, phase in enumerate(self.phases + ["total"]):
+            summary[phase] = {"p50": p50[i], "p99": p99[i], "max": peak[i]}
+        return summary
+
+    def print_summary(self):
+        summary = self.get_summary()
+        print(f"Tick profile over the last {min(self.num_ticks, self.capacity)} ticks")
+        print(f"{'phase':<14}{'p50 [ms]':>10}{'p99 [ms]':>10}{'max [ms]':>10}")
+        for phase, stats in summary.items():
+            print(f"{phase:<14}{stats['p50']*1e3:>10.3f}{stats['p99']*1e3:>10.3f}{stats['max']*1e3:>10.3f}")
+
+    # Write the per-tick phase durations (in ms) to a CSV file
+    def export(self, file_name):
+        np.savetxt(file_name, self.get_durations()*1e3, delimiter=',', header=','.join(self.phases), comments='', fmt='%.4f')
@@ -0,0 +1,71 @@
+import time
+import numpy as np
+import pandas as pd
+from GaitCycles import compute_average_dt, debounce_cycles, debounce_foot_contact, find_cycles, segment_cycles
+
+# Cost of debouncing the foot pressure of a log, per cycle as in the analysis scripts and over the whole signal
+# The vectorized debouncers of GaitCycles are compared with the previous per-sample loop, their output must be identical
+FILE_NAME = "PASSIVE_20240722_175536.csv"
+PERIOD_OFFSET = 0.5
+FIELDS = ["pressure 1", "pressure 3"]
+THRESHOLD = 0.5
+ALPHAS = [1, 0.2]
+NUM_REPEATS = 20
+
+# Previous debouncer of plot_pressure_debouncing.py, plot_gait_ratios.py and plot_average_footfall.py
+def debounce_loop(data, threshold, alpha=1):
+    debounced = np.zeros_like(data, dtype=int)
+    in_contact = False
+    contact_start = -1
+    data_copy = data.copy()
+    for i in range(1, len(data)):
+        data_copy[i] = data_copy[i-1]*(1-alpha) + data[i]*alpha
+        if not in_contact and data_copy[i] - data_copy[0] > threshold:
+            in_contact = True
+            contact_start = i
+        elif in_contact and data_copy[i] - data_copy[0] <= threshold:
+            break
+    if contact_start != -1:
+        debounced[contact_start:i] = 1
+    return debounced
+
+def time_call(function, *args):
+    times = np.zeros(NUM_REPEATS)
+    for k in range(NUM_REPEATS):
+        start = time.perf_counter()
+        function(*args)
+        times[k] = time.perf_counter() - start
+    return np.median(times)
+
+def main():
+    data = pd.read_csv(FILE_NAME)
+    dt = compute_average_dt(data['timestamp'].values)
+    starts, ends = find_cycles(data['foot_contact 1'].values, dt, PERIOD_OFFSET, clip_start=True, drop_last=True)
+    lengths = ends - starts
+    print(f"{FILE_NAME}: {len(data)} rows, {len(starts)} cycles")
+
+    print(f"{'field':>12}{'alpha':>7}{'loop [ms]':>12}{'per cycle [ms]':>16}{'batched [ms]':>14}{'speedup':>9}"
+          f"{'signal loop [ms]':>18}{'signal [ms]':>13}{'speedup':>9}")
+    for field in FIELDS:
+        signal = data[field].values
+        cycles = segment_cycles(signal, starts, ends)
+        for alpha in ALPHAS:
+            loop = lambda: [debounce_loop(signal[a:b], THRESHOLD, alpha) for a, b in zip(starts, ends)]
+            per_cycle = lambda: [debounce_foot_contact(signal[a:b], THRESHOLD, alpha) for a, b in zip(starts, ends)]
+            batched = lambda: debounce_cycles(cycles, lengths, THRESHOLD, alpha)
+
+            # All implementations give the same contacts
+            reference = loop()
+            assert all(np.array_equal(x, y) for x, y in zip(reference, per_cycle()))
+            assert np.array_equal(np.concatenate(reference), batched()[~np.isnan(batched())])
+            assert np.array_equal(debounce_loop(signal, THRESHOLD, alpha), debounce_foot_contact(signal, THRESHOLD, alpha))
+
+            loop_time, per_cycle_time, batched_time = time_call(loop), time_call(per_cycle), time_call(batched)
+            signal_loop_time = time_call(debounce_loop, signal, THRESHOLD, alpha)
+            signal_time = time_call(debounce_foot_contact, signal, THRESHOLD, alpha)
+            print(f"{field:>12}{alpha:>7}{loop_time*1e3:>12.2f}{per_cycle_time*1e3:>16.2f}{batched_time*1e3:>14.3f}"
+                  f"{loop_time/batched_time:>9.1f}{signal_loop_time*1e3:>18.2f}{signal_time*1e3:>13.3f}"
+                  f"{signal_loop_time/signal_time:>9.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import time
+import numpy as np
+from HopfNetwork import HopfNetwork
+
+# Cost of a HopfNetwork step, with the vectorized integrator and the previous per-oscillator loop
+# A batch of networks is stepped in one call against one loop step per network. The vectorized step integrates
+# every oscillator from the state at the start of the step, the loop integrated later oscillators against the
+# partially updated state, the difference between the two is reported.
+BATCH_SIZES = [1, 10, 100, 1000]
+NUM_STEPS = 200
+CONTACT_PERIOD = 40     # steps per period of the synthetic foot contact
+SEED = 0
+DT = 0.01               # the default time step of 0.03 makes the Euler step of the amplitude chaotic (alpha*dt > 1)
+
+# Previous HopfNetwork.integrate_hopf
+def integrate_hopf_loop(hopf, foot_contact):
+    X = hopf.X.copy()
+    X_dot = hopf.X_dot.copy()
+
+    for i in range(4):
+        r, theta = hopf.get_r()[i], hopf.get_theta()[i]
+        r_dot = hopf.alpha*(hopf.mu - r**2)*r
+
+        if foot_contact[i]:
+            theta_dot = hopf.omega_stance
+        else:
+            theta_dot = hopf.omega_swing
+
+        if hopf.couple:
+            theta_dot += hopf.coupling_strength*np.sum(hopf.get_r()*np.sin(hopf.get_theta() - theta - hopf.PHI[i, :]))
+
+        X_dot[:, i] = [r_dot, theta_dot]
+
+        # Integrate
+        hopf.X = X + hopf.dt*X_dot
+        hopf.X_dot = X_dot
+
+        hopf.X[1, :] = np.mod(hopf.X[1, :], 2*np.pi)
+
+# Previous HopfNetwork.update
+def update_loop(hopf, foot_contact):
+    integrate_hopf_loop(hopf, foot_contact)
+    cmd_angle = np.zeros(4)
+    for i in range(4):
+        if foot_contact[i]:
+            cmd_angle[i] = hopf.amp_stance*np.sin(hopf.get_theta()[i])
+        else:
+            cmd_angle[i] = hopf.amp_swing*np.sin(hopf.get_theta()[i])
+    return cmd_angle
+
+# Per-oscillator loop reading the state at the start of the step, the reference of the vectorized step
+def update_reference(hopf, foot_contact):
+    r, theta = hopf.get_r().copy(), hopf.get_theta().copy()
+    X_dot = np.zeros((2, 4))
+    for i in range(4):
+        X_dot[0, i] = hopf.alpha*(hopf.mu - r[i]**2)*r[i]
+        X_dot[1, i] = hopf.omega_stance if foot_contact[i] else hopf.omega_swing
+        if hopf.couple:
+            X_dot[1, i] += hopf.coupling_strength*np.sum(r*np.sin(theta - theta[i] - hopf.PHI[i, :]))
+    hopf.X = hopf.X + hopf.dt*X_dot
+    hopf.X[1, :] = np.mod(hopf.X[1, :], 2*np.pi)
+    return np.where(foot_contact, hopf.amp_stance, hopf.amp_swing)*np.sin(hopf.get_theta())
+
+# Random initial states and foot contact sequences (steps x batch x 4), shifted per leg as in a trot
+def make_inputs(batch_size, rng):
+    X0 = np.stack([rng.uniform(0.1, 1, (batch_size, 4)), rng.uniform(0, 2*np.pi, (batch_size, 4))], axis=1)
+    shift = rng.integers(0, CONTACT_PERIOD, (batch_size, 1)) + np.array([0, 0.5, 0.5, 0])*CONTACT_PERIOD
+    steps = np.arange(NUM_STEPS)[:, None, None]
+    foot_contact = ((steps + shift) % CONTACT_PERIOD) < CONTACT_PERIOD/2
+    return X0, foot_contact
+
+def run_loop(X0, foot_contact, update):
+    networks = [HopfNetwork(dt=DT) for _ in range(len(X0))]
+    for hopf, X in zip(networks, X0):
+        hopf.X = X.copy()
+    outputs = np.zeros(foot_contact.shape)
+    start = time.perf_counter()
+    for k in range(NUM_STEPS):
+        for b, hopf in enumerate(networks):
+            outputs[k, b] = update(hopf, foot_contact[k, b])
+    return outputs, time.perf_counter() - start
+
+def run_batched(X0, foot_contact):
+    hopf = HopfNetwork(dt=DT, batch_size=len(X0))
+    hopf.X = X0.copy()
+    outputs = np.zeros(foot_contact.shape)
+    start = time.perf_counter()
+    for k in range(NUM_STEPS):
+        outputs[k] = hopf.update(foot_contact[k])
+    return outputs, time.perf_counter() - start
+
+def main():
+    rng = np.random.default_rng(SEED)
+    print(f"{'networks':>9}{'loop [us/step]':>16}{'batched [us/step]':>19}{'speedup':>9}"
+          f"{'max error':>11}{'loop deviation':>16}")
+    for batch_size in BATCH_SIZES:
+        X0, foot_contact = make_inputs(batch_size, rng)
+        loop_outputs, loop_time = run_loop(X0, foot_contact, update_loop)
+        reference_outputs, _ = run_loop(X0, foot_contact, update_reference)
+        batched_outputs, batched_time = run_batched(X0, foot_contact)
+
+        error = np.max(np.abs(batched_outputs - reference_outputs))
+        deviation = np.max(np.abs(loop_outputs - reference_outputs))
+        print(f"{batch_size:>9}{loop_time/NUM_STEPS*1e6:>16.1f}{batched_time/NUM_STEPS*1e6:>19.1f}"
+              f"{loop_time/batched_time:>9.1f}{error:>11.1e}{deviation:>16.1e}")
+
+if __name__ == "__main__":
+    main()
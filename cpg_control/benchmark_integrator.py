@@ -0,0 +1,69 @@
+import time
+import numpy as np
+from HopfNetwork import HopfNetwork
+
+# Phase error and cost per tick of the HopfNetwork integrators when advancing by the measured elapsed time
+# Ticks are jittered around the loop period and the foot contact of a trot is held over each tick. The reference
+# integrates the same ticks with RK4 substeps of REFERENCE_STEP. The fixed dt row is the previous behaviour,
+# advancing by dt = 0.03 s whatever the tick period.
+RATES = [100, 200, 500]         # control loop rates (Hz)
+JITTER = 0.2                    # uniform tick period jitter, fraction of the period
+DURATION = 10
+CONTACT_PERIOD = 1.0
+REFERENCE_STEP = 1e-4
+PHASE_TOLERANCE = 0.01          # rad
+SEED = 0
+CONFIGURATIONS = [
+    ("EULER", None),
+    ("EULER", 0.005),
+    ("EULER", 0.002),
+    ("EXACT", None),
+    ("EXACT", 0.005),
+    ("RK4", None),
+    ("RK4", 0.005),
+]
+
+def make_ticks(rate, rng):
+    periods = (1 + JITTER*rng.uniform(-1, 1, int(DURATION*rate)))/rate
+    timestamps = np.cumsum(periods)
+    foot_contact = ((timestamps[:, None]/CONTACT_PERIOD - np.array([0.5, 0, 0, 0.5])) % 1) < 0.5
+    return timestamps, foot_contact
+
+# Run a network through the ticks, returns the phases after every tick and the mean time per tick
+def run(hopf, timestamps, foot_contact, X0, use_timestamps=True):
+    hopf.X = X0.copy()
+    theta = np.zeros((len(timestamps), 4))
+    start = time.perf_counter()
+    for k in range(len(timestamps)):
+        hopf.update(foot_contact[k], timestamps[k] if use_timestamps else None)
+        theta[k] = hopf.get_theta()
+    return theta, (time.perf_counter() - start)/len(timestamps)
+
+def get_phase_error(theta, reference):
+    return np.max(np.abs(np.angle(np.exp(1j*(theta - reference)))))
+
+def main():
+    rng = np.random.default_rng(SEED)
+    X0 = np.stack([rng.uniform(0.2, 1, 4), rng.uniform(0, 2*np.pi, 4)])
+    print(f"{'rate [Hz]':>10}{'integrator':>12}{'max step [ms]':>15}{'cost [us/tick]':>16}{'phase error [rad]':>19}")
+    for rate in RATES:
+        timestamps, foot_contact = make_ticks(rate, rng)
+        reference_hopf = HopfNetwork(integrator="RK4", max_step=REFERENCE_STEP, max_substeps=10**6)
+        reference, _ = run(reference_hopf, timestamps, foot_contact, X0)
+
+        theta, cost = run(HopfNetwork(), timestamps, foot_contact, X0, use_timestamps=False)
+        print(f"{rate:>10}{'fixed dt':>12}{'-':>15}{cost*1e6:>16.1f}{get_phase_error(theta, reference):>19.2e}")
+
+        cheapest = None
+        for integrator, max_step in CONFIGURATIONS:
+            theta, cost = run(HopfNetwork(integrator=integrator, max_step=max_step), timestamps, foot_contact, X0)
+            error = get_phase_error(theta, reference)
+            if error <= PHASE_TOLERANCE and (cheapest is None or cost < cheapest[2]):
+                cheapest = (integrator, max_step, cost)
+            max_step = '-' if max_step is None else f"{max_step*1e3:g}"
+            print(f"{rate:>10}{integrator:>12}{max_step:>15}{cost*1e6:>16.1f}{error:>19.2e}")
+        if cheapest is not None:
+            print(f"{'':>10}cheapest within {PHASE_TOLERANCE} rad: {cheapest[0]}, max step {cheapest[1]}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import csv
+import os
+import tempfile
+import time
+import numpy as np
+from DataPlotter import CSVTailReader
+
+# Per-frame cost of reading the live CSV while a log grows to 30 minutes
+# The tail reader of plot_live_data is compared with the previous reader, which parsed the whole file every frame
+TIMESTEP = 0.01
+CHECKPOINTS = [1*60, 5*60, 10*60, 20*60, 30*60]
+UPDATE_INTERVAL = 0.02                      # time between two animation frames (s)
+MAX_DATA_POINTS = 200
+NUM_FRAMES = 50
+NUM_FULL_FRAMES = 3                         # frames timed with the full reader, which is slow on long logs
+CONTROLLER_IDS = [1, 3]
+NUMERIC_FIELDS = ["position 1", "position 3"]
+BOOLEAN_FIELDS = ["foot_contact 1", "foot_contact 3"]
+
+def get_fields():
+    fields = ["timestamp"]
+    for i in CONTROLLER_IDS:
+        fields += ["position " + str(i), "command_position " + str(i), "velocity " + str(i), "torque " + str(i),
+                   "power " + str(i), "pressure " + str(i), "foot_contact " + str(i)]
+    return fields
+
+# Append num_rows rows formatted like DataLogger (4 decimals, booleans as True/False)
+def append_rows(csv_file, start_row, num_rows, rng):
+    with open(csv_file, 'a', newline='') as f:
+        writer = csv.writer(f)
+        for k in range(start_row, start_row + num_rows):
+            row = [1721663736.0 + k*TIMESTEP]
+            for _ in CONTROLLER_IDS:
+                row += list(np.round(rng.normal(size=6), 4)) + [bool(rng.integers(2))]
+            writer.writerow(row)
+
+# Previous reader of plot_live_data, the whole file is parsed on every frame
+def read_full(csv_file, numeric_fields, boolean_fields, max_data_points):
+    x_data = []
+    numeric_data = [[] for _ in numeric_fields]
+    boolean_data = [[] for _ in boolean_fields]
+    with open(csv_file, 'r') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            x_data.append(float(row['timestamp']))
+            for i, field_name in enumerate(numeric_fields):
+                try:
+                    numeric_data[i].append(float(row[field_name]))
+                except ValueError:
+                    numeric_data[i].append(None)
+            for i, field_name in enumerate(boolean_fields):
+                value = row[field_name].lower()
+                boolean_data[i].append(1 if value == 'true' else 0 if value == 'false' else None)
+    x_data = x_data[-max_data_points:]
+    numeric_data = [data[-max_data_points:] for data in numeric_data]
+    boolean_data = [data[-max_data_points:] for data in boolean_data]
+    return x_data, numeric_data, boolean_data
+
+def main():
+    rng = np.random.default_rng(0)
+    rows_per_frame = int(round(UPDATE_INTERVAL/TIMESTEP))
+    with tempfile.TemporaryDirectory() as directory:
+        csv_file = os.path.join(directory, "benchmark.csv")
+        with open(csv_file, 'w', newline='') as f:
+            csv.writer(f).writerow(get_fields())
+
+        reader = CSVTailReader(csv_file, NUMERIC_FIELDS, BOOLEAN_FIELDS, MAX_DATA_POINTS)
+        num_rows = 0
+
+        print(f"{'log [min]':>10}{'rows':>10}{'tail p50 [ms]':>15}{'tail max [ms]':>15}{'full p50 [ms]':>15}")
+        for checkpoint in CHECKPOINTS:
+            # Grow the log to the checkpoint, the tail reader follows it as the plot process would
+            target_rows = int(checkpoint/TIMESTEP)
+            while num_rows < target_rows:
+                num_new_rows = min(int(10/TIMESTEP), target_rows - num_rows)
+                append_rows(csv_file, num_rows, num_new_rows, rng)
+                num_rows += num_new_rows
+                reader.read()
+
+            tail_times = np.zeros(NUM_FRAMES)
+            for k in range(NUM_FRAMES):
+                append_rows(csv_file, num_rows, rows_per_frame, rng)
+                num_rows += rows_per_frame
+                start = time.perf_counter()
+                reader.read()
+                reader.get_data()
+                tail_times[k] = time.perf_counter() - start
+
+            full_times = np.zeros(NUM_FULL_FRAMES)
+            for k in range(NUM_FULL_FRAMES):
+                start = time.perf_counter()
+                read_full(csv_file, NUMERIC_FIELDS, BOOLEAN_FIELDS, MAX_DATA_POINTS)
+                full_times[k] = time.perf_counter() - start
+
+            # Both readers hold the same rows
+            x_tail, numeric_tail, _ = reader.get_data()
+            x_full, numeric_full, _ = read_full(csv_file, NUMERIC_FIELDS, BOOLEAN_FIELDS, MAX_DATA_POINTS)
+            assert np.array_equal(x_tail, x_full) and np.array_equal(numeric_tail, numeric_full)
+
+            print(f"{checkpoint/60:>10.0f}{num_rows:>10}{np.median(tail_times)*1e3:>15.3f}{np.max(tail_times)*1e3:>15.3f}"
+                  f"{np.median(full_times)*1e3:>15.1f}")
+
+if __name__ == "__main__":
+    main()
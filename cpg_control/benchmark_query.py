@@ -0,0 +1,62 @@
+import asyncio
+import time
+import moteus
+import numpy as np
+from PAWS import PAWS, QUERY_PROFILES, make_query_resolution
+from SimController import SimBackend
+
+# Bus time of PAWS.update for each query profile
+MODE = "PASSIVE"
+CONTROLLER_IDS = [1, 2, 3, 4]
+UPDATE_MODE = "BATCHED"
+QUERY_DECIMATION = 10
+NUM_TICKS = 1000
+NUM_WARMUP_TICKS = 50
+SIMULATE = False
+CAN_FD_BITRATE = 5e6    # data phase bitrate (bit/s)
+
+# Return the reply size in bytes of a query profile, as formatted by moteus
+def get_reply_size(profile):
+    qr = make_query_resolution(profile)
+    _, reply_size = moteus.Controller(id=1, query_resolution=qr)._make_query_data(qr)
+    return reply_size
+
+async def benchmark(query_profile):
+    backend = SimBackend() if SIMULATE else None
+    paws = PAWS(controller_ids=CONTROLLER_IDS, mode=MODE, max_torque=0.1, update_mode=UPDATE_MODE, backend=backend,
+                query_profile=query_profile, query_decimation=QUERY_DECIMATION, verbose=False)
+    await paws.create_controllers()
+
+    for _ in range(NUM_WARMUP_TICKS):
+        await paws.update(time.time())
+
+    latencies = np.zeros(NUM_TICKS)
+    for k in range(NUM_TICKS):
+        start = time.perf_counter()
+        await paws.update(time.time())
+        latencies[k] = time.perf_counter() - start
+
+    for i in CONTROLLER_IDS:
+        await paws.controllers[i-1].set_stop()
+
+    return latencies*1e3
+
+async def main():
+    control_size = get_reply_size("CONTROL")
+    logging_size = get_reply_size("LOGGING")
+    reply_sizes = {
+        "CONTROL": control_size,
+        "LOGGING": logging_size,
+        "DECIMATED": control_size + (logging_size - control_size)/QUERY_DECIMATION,
+    }
+
+    print(f"{'profile':<12}{'reply [B]':>10}{'data phase [us]':>17}{'mean [ms]':>11}{'p50 [ms]':>10}{'p99 [ms]':>10}")
+    for query_profile in QUERY_PROFILES:
+        latencies = await benchmark(query_profile)
+        # Data phase time of the replies of all controllers during one tick
+        data_time = len(CONTROLLER_IDS)*reply_sizes[query_profile]*8/CAN_FD_BITRATE
+        print(f"{query_profile:<12}{reply_sizes[query_profile]:>10.1f}{data_time*1e6:>17.1f}{np.mean(latencies):>11.3f}"
+              f"{np.percentile(latencies, 50):>10.3f}{np.percentile(latencies, 99):>10.3f}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
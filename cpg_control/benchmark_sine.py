@@ -0,0 +1,68 @@
+import time
+import numpy as np
+from SineNetwork import SineNetwork
+
+# Cost of SineNetwork.update with the trajectory tables against the previous per-leg loop, for growing numbers of legs
+# The loop printed the commands on every tick, the print is left out here so that only the computation is timed
+NUM_LEGS = [4, 16, 64]
+NUM_TICKS = 5000
+TIMESTEP = 0.01
+CONTACT_PERIOD = 1.0
+SEED = 0
+
+# Previous SineNetwork.update
+def update_loop(sine, foot_contact, timestamp):
+    num_legs = len(sine.amp)
+    cmd_angle = np.zeros(num_legs)
+
+    if sine.sync_pressure:
+        if foot_contact[2] and not sine.previous_foot_contact:
+            sine.t_start = timestamp
+    else:
+        if timestamp > sine.t_start + sine.period:
+            sine.t_start = timestamp
+
+    sine.previous_foot_contact = foot_contact[2]
+
+    if sine.t_start is not None:
+        t = timestamp
+        for i in range(num_legs):
+            period = (2 * np.pi) / sine.omega[i] if sine.omega[i] != 0 else np.inf
+            if t - sine.t_start < sine.t_off[i]:
+                cmd_angle[i] = 0
+            elif t - sine.t_start <= period + sine.t_off[i]:
+                cmd_angle[i] = (-sine.amp[i] * np.sin(sine.omega[i] * (t - sine.t_start - sine.t_off[i]) + sine.theta[i])
+                                + sine.amp[i] * np.sin(sine.theta[i]))
+            else:
+                cmd_angle[i] = 0
+
+            cmd_angle[i] += sine.offset[i]
+    return cmd_angle
+
+def make_network(num_legs, rng):
+    return SineNetwork(amp=rng.uniform(0, 2, num_legs), omega=2*np.pi/rng.uniform(0.5, 5, num_legs),
+                       theta=rng.uniform(-np.pi, np.pi, num_legs), offset=rng.uniform(-0.5, 0.5, num_legs),
+                       t_off=rng.uniform(0, 0.2, num_legs))
+
+def run(sine, update, timestamps, foot_contact):
+    commands = np.zeros((len(timestamps), len(sine.amp)))
+    start = time.perf_counter()
+    for k in range(len(timestamps)):
+        commands[k] = update(sine, foot_contact[k], timestamps[k])
+    return commands, (time.perf_counter() - start)/len(timestamps)
+
+def main():
+    rng = np.random.default_rng(SEED)
+    timestamps = np.arange(NUM_TICKS)*TIMESTEP
+    foot_contact = (timestamps[:, None] % CONTACT_PERIOD) < CONTACT_PERIOD/2 + np.zeros(4, dtype=bool)
+    print(f"{'legs':>6}{'loop [us/tick]':>16}{'tables [us/tick]':>18}{'speedup':>9}{'max error [turns]':>19}")
+    for num_legs in NUM_LEGS:
+        sine = make_network(num_legs, rng)
+        loop_commands, loop_time = run(sine, update_loop, timestamps, foot_contact)
+        sine.t_start, sine.previous_foot_contact = 0, False
+        commands, table_time = run(sine, SineNetwork.update, timestamps, foot_contact)
+        print(f"{num_legs:>6}{loop_time*1e6:>16.1f}{table_time*1e6:>18.1f}{loop_time/table_time:>9.1f}"
+              f"{np.max(np.abs(commands - loop_commands)):>19.1e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import asyncio
+import time
+import numpy as np
+from PAWS import PAWS, UPDATE_MODES
+from SimController import SimBackend
+
+# Per-tick latency of PAWS.update for each update mode and set of controllers
+MODE = "PASSIVE"
+CONTROLLER_SETS = [[1, 3], [1, 2, 3, 4]]
+NUM_TICKS = 1000
+NUM_WARMUP_TICKS = 50
+SIMULATE = False
+SIM_LATENCY = 0.0005
+
+async def benchmark(controller_ids, update_mode):
+    backend = SimBackend(latency=SIM_LATENCY) if SIMULATE else None
+    paws = PAWS(controller_ids=controller_ids, mode=MODE, max_torque=0.1, update_mode=update_mode, backend=backend)
+    await paws.create_controllers()
+
+    for _ in range(NUM_WARMUP_TICKS):
+        await paws.update(time.time())
+
+    latencies = np.zeros(NUM_TICKS)
+    for k in range(NUM_TICKS):
+        start = time.perf_counter()
+        await paws.update(time.time())
+        latencies[k] = time.perf_counter() - start
+
+    # Leave the controllers stopped
+    for i in controller_ids:
+        await paws.controllers[i-1].set_stop()
+
+    return latencies*1e3
+
+async def main():
+    print(f"{'controllers':<14}{'update mode':<14}{'mean [ms]':>10}{'p50 [ms]':>10}{'p99 [ms]':>10}{'max [ms]':>10}")
+    for controller_ids in CONTROLLER_SETS:
+        for update_mode in UPDATE_MODES:
+            latencies = await benchmark(controller_ids, update_mode)
+            print(f"{str(controller_ids):<14}{update_mode:<14}{np.mean(latencies):>10.3f}{np.percentile(latencies, 50):>10.3f}"
+                  f"{np.percentile(latencies, 99):>10.3f}{np.max(latencies):>10.3f}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -4,48 +4,90 @@ import moteus
 from PAWS import PAWS
 from DataLogger import DataLogger
 from DataPlotter import DataPlotter
+from SharedBuffer import SharedRingBuffer
+from Scheduler import FixedRateScheduler
+from TickProfiler import TickProfiler
+from SimController import SimBackend
 import numpy as np
 
 TIMESTEP = 0.01
+OVERRUN_POLICY = "SKIP"
 CONTROLLER_IDS = [1, 3]
 MODE = "JUMP3"
+LOG_BUFFERED = True
+LOG_FORMAT = "CSV"  # "CSV" or "BINARY"
 LOG_DATA = True
 PLOT_DATA = True
 RECOVERY = False
+UPDATE_MODE = "SEQUENTIAL"       # "BATCHED" sends all commands in one transport cycle, not validated on the robot yet
+RECAPTURE_MODE = "ALWAYS"        # "ON_CHANGE" skips the recapture while the command is unchanged, not validated on the robot yet
+QUERY_PROFILE = "LOGGING"
+PROFILE = False
+PROFILE_EXPORT = True
+SIMULATE = False
+CALIBRATE_CONTACT = True    # load the foot contact thresholds of the calibration file, calibrating first if there is none
+RECALIBRATE = False         # calibrate again, e.g. after changing the tendons
 TRN_TO_RAD = 2*np.pi
 
-async def motor_control(logger, paws):
+# Every tick is written to all sinks (DataLogger, SharedRingBuffer)
+async def motor_control(sinks, paws, profiler=None):
+    scheduler = FixedRateScheduler(TIMESTEP, policy=OVERRUN_POLICY)
+    scheduler.start()
     try:
         while True:
+            if profiler is not None:
+                profiler.start_tick()
             await paws.update(time.time())
             state, foot_contact = paws.get_state()
 
             # Log values
-            logger.set_field("timestamp", time.time())
-            for i in CONTROLLER_IDS:
-                logger.set_field("position " + str(i), state[i-1].values[moteus.Register.POSITION]*TRN_TO_RAD)
-                logger.set_field("command_position " + str(i), state[i-1].values[moteus.Register.COMMAND_POSITION]*TRN_TO_RAD)
-                logger.set_field("velocity " + str(i), state[i-1].values[moteus.Register.VELOCITY]*TRN_TO_RAD)
-                logger.set_field("torque " + str(i), state[i-1].values[moteus.Register.TORQUE])
-                logger.set_field("power " + str(i), state[i-1].values[moteus.Register.POWER])
-                logger.set_field("pressure " + str(i), state[i-1].values[moteus.Register.MOTOR_TEMPERATURE])
-                logger.set_field("foot_contact " + str(i), foot_contact[i-1])
-
-            # Update CSV file
-            logger.write_line()
-
-            await asyncio.sleep(TIMESTEP)
+            timestamp = time.time()
+            for sink in sinks:
+                sink.set_field("timestamp", timestamp)
+                for i in CONTROLLER_IDS:
+                    sink.set_field("position " + str(i), state[i-1].values[moteus.Register.POSITION]*TRN_TO_RAD)
+                    sink.set_field("command_position " + str(i), state[i-1].values[moteus.Register.COMMAND_POSITION]*TRN_TO_RAD)
+                    sink.set_field("velocity " + str(i), state[i-1].values[moteus.Register.VELOCITY]*TRN_TO_RAD)
+                    sink.set_field("torque " + str(i), state[i-1].values[moteus.Register.TORQUE])
+                    sink.set_field("power " + str(i), state[i-1].values[moteus.Register.POWER])
+                    sink.set_field("pressure " + str(i), state[i-1].values[moteus.Register.MOTOR_TEMPERATURE])
+                    sink.set_field("foot_contact " + str(i), foot_contact[i-1])
+            if profiler is not None:
+                profiler.mark("log_fields")
+
+            # Update CSV file and shared buffer
+            for sink in sinks:
+                sink.write_line()
+            if profiler is not None:
+                profiler.mark("write_line")
+                profiler.end_tick()
+
+            # Wait for the next tick deadline
+            await scheduler.wait()
     except KeyboardInterrupt:
         print("Motor control task interrupted.")
+    finally:
+        scheduler.print_statistics()
 
 async def main():
+    # Create tick profiler, phase timings are not recorded when disabled
+    profiler = TickProfiler() if PROFILE else None
+
+    # Use simulated controllers instead of the CAN bus when simulating
+    backend = SimBackend() if SIMULATE else None
+
     # Create new PAWS object
-    paws = PAWS(controller_ids=CONTROLLER_IDS, mode=MODE, recovery=RECOVERY, max_torque=0.1, once = False, initial_jumps = 0)
+    paws = PAWS(controller_ids=CONTROLLER_IDS, mode=MODE, recovery=RECOVERY, max_torque=0.1, once = False, initial_jumps = 0, update_mode=UPDATE_MODE, profiler=profiler, backend=backend, recapture_mode=RECAPTURE_MODE, query_profile=QUERY_PROFILE)
     await paws.create_controllers()
     await paws.set_zero_position()
 
+    # Simulated pressure is not calibrated, so that it does not overwrite the calibration of the robot
+    if CALIBRATE_CONTACT and not SIMULATE:
+        await paws.calibrate_contact(recalibrate=RECALIBRATE, timestep=TIMESTEP)
+
     # Create new DataLogger object
-    logger = DataLogger(MODE)
+    # Rows are written by a background thread when buffered
+    logger = DataLogger(MODE, buffered=LOG_BUFFERED, file_format=LOG_FORMAT)
 
     # Add fields to the logger
     logger.add_field("timestamp")
@@ -56,37 +98,35 @@ async def main():
         logger.add_field("torque " + str(i), decimals=4)
         logger.add_field("power " + str(i), decimals=4)
         logger.add_field("pressure " + str(i), decimals=4)
-        logger.add_field("foot_contact " + str(i))
+        logger.add_field("foot_contact " + str(i), dtype='?')
 
-    # Use default name for CSV file (date and time)
-    logger.create_file()
+    sinks = []
+    if LOG_DATA:
+        # Use default name for CSV file (date and time)
+        logger.create_file()
+        sinks.append(logger)
 
     if PLOT_DATA:
 
-        # Create plotter object
-        plotter = DataPlotter(logger.get_file_name())
-
-        # create process for position 1 and posistion 3
-        plotter.create_process(["position 1", "position 3"], ["foot_contact 1", "foot_contact 3"], "Motor position", "Angle (rad)", 200, 20)
+        # Live plots read the last ticks from shared memory, the CSV file is not needed for plotting
+        shared_buffer = SharedRingBuffer(logger.fields)
+        sinks.append(shared_buffer)
 
-        # create process for torque 1 and torque 3
-        plotter.create_process(["torque 1", "torque 3"], ["foot_contact 1", "foot_contact 3"], "Motor torque", "Torque (Nm)", 200, 20)
-
-        # create process for command position 1 and command position 3
-        plotter.create_process(["command_position 1", "command_position 3"], ["foot_contact 1", "foot_contact 3"], "Commanded position", "Angle (rad)", 200, 20)
-
-        # create process for velocity 1 and velocity 3 
-        plotter.create_process(["velocity 1", "velocity 3"], ["foot_contact 1", "foot_contact 3"], "Motor velocity", "Angular speed (rad/s)", 200, 20)
-
-        # create process for pressure 1 and pressure 3 
-        plotter.create_process(["pressure 1", "pressure 3"], ["foot_contact 1", "foot_contact 3"], "Foot pressure", "Analog readings (-)", 200, 20)
+        # Create plotter object
+        plotter = DataPlotter(shared_buffer=shared_buffer)
 
-        # create process for pressure 1 and pressure 3 
-        plotter.create_process(["power 1", "power 3"], ["foot_contact 1", "foot_contact 3"], "Motor power", "Power (W)", 200, 20)
+        # One dashboard process draws every panel from the shared buffer
+        panels = [(["position 1", "position 3"], "Motor position", "Angle (rad)"),
+                  (["torque 1", "torque 3"], "Motor torque", "Torque (Nm)"),
+                  (["command_position 1", "command_position 3"], "Commanded position", "Angle (rad)"),
+                  (["velocity 1", "velocity 3"], "Motor velocity", "Angular speed (rad/s)"),
+                  (["pressure 1", "pressure 3"], "Foot pressure", "Analog readings (-)"),
+                  (["power 1", "power 3"], "Motor power", "Power (W)")]
+        plotter.create_dashboard(panels, ["foot_contact 1", "foot_contact 3"])
 
     try:
         # Start motor control task
-        motor_task = asyncio.create_task(motor_control(logger, paws))
+        motor_task = asyncio.create_task(motor_control(sinks, paws, profiler))
         await motor_task
 
     except KeyboardInterrupt:
@@ -94,13 +134,23 @@ async def main():
 
     finally:
 
+        paws.print_statistics()
+
+        if profiler is not None:
+            profiler.print_summary()
+            if PROFILE_EXPORT:
+                profile_file = logger.get_file_name().replace('.csv', '_profile.csv') if LOG_DATA else MODE + "_profile.csv"
+                profiler.export(profile_file)
+
         if PLOT_DATA:
             # Terminate the plotting process when motor control stops
             plotter.terminate_processes()
+            shared_buffer.close()
 
-        # Delete CSV file if logging is disabled
-        if not LOG_DATA:
-            logger.delete_file()
+        if LOG_DATA:
+            # Write the remaining rows and close the CSV file
+            logger.close()
+            logger.print_statistics()
 
 
 if __name__ == "__main__":
@@ -1,6 +1,10 @@
-import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
+from GaitCycles import compute_average_data, compute_average_dt, pad_to_max_length
+from DataCache import DataCache
+
+# Parsed logs are cached on disk, see DataCache.py
+cache = DataCache()
 
 FACTOR = 180 / (np.pi)  # Conversion factor from radians to degrees
 PERIOD_OFFSET = 0.35  # Offset in seconds before and after foot contact
@@ -24,60 +28,6 @@ file_paths = {
 }
 speeds = [1, 1.5, 2, 2.5, 3]  # Corresponding speeds in km/h
 
-# Function to compute average data across periods
-def compute_average_data(timestamps, foot_contact1, data1, data2, factor=1.0, offset=False):
-    avg_data1 = []
-    avg_data2 = []
-
-    # Identify the transition points from False to True in foot_contact1
-    transitions = np.where((foot_contact1[:-1] == False) & (foot_contact1[1:] == True))[0]
-
-    # List to store data for each period
-    periods_data1 = []
-    periods_data2 = []
-
-    for i in range(len(transitions)):
-        start_index = transitions[i] - int(PERIOD_OFFSET / dt)  # 0.5 seconds before transition
-
-        if i < len(transitions) - 1:
-            end_index = transitions[i + 1] - int(PERIOD_OFFSET / dt)
-        else:
-            end_index = len(timestamps) - 1 - int(PERIOD_OFFSET / dt)
-
-        period_data1 = data1[start_index:end_index]
-        period_data2 = data2[start_index:end_index]
-
-        periods_data1.append(period_data1)
-        periods_data2.append(period_data2)
-
-    # Find the maximum length of periods to align data
-    max_length = max(len(period) for period in periods_data1)
-
-    # Pad periods with NaN values to make them the same length
-    for i in range(len(periods_data1)):
-        periods_data1[i] = np.pad(periods_data1[i], (0, max_length - len(periods_data1[i])), constant_values=np.nan)
-        periods_data2[i] = np.pad(periods_data2[i], (0, max_length - len(periods_data2[i])), constant_values=np.nan)
-
-    # Calculate average across all periods for each data point
-    avg_data1 = np.nanmean(periods_data1, axis=0)
-    avg_data2 = np.nanmean(periods_data2, axis=0)
-
-    # Apply the factor for unit conversion
-    avg_data1 = np.array(avg_data1) * factor
-    avg_data2 = np.array(avg_data2) * factor
-
-    if offset:
-        # Offset positions to start at y=0
-        avg_data1 = np.array(avg_data1) - avg_data1[0]
-        avg_data2 = np.array(avg_data2) - avg_data2[0]
-
-    return avg_data1, avg_data2, dt
-
-# Function to compute average time step (dt) from timestamps
-def compute_average_dt(timestamps):
-    dt = np.mean(np.diff(timestamps))  # Calculate mean time difference
-    return dt
-
 # Iterate over each speed and process the corresponding files
 fig, axs = plt.subplots(1, 1, figsize=(12, 12), sharex=True)
 
@@ -91,7 +41,7 @@ for idx, speed in enumerate(speeds):
 
     for file_path in file_paths[speed]:
         # Load the data from the CSV file
-        data = pd.read_csv(file_path)
+        data = cache.read_log(file_path)
 
         # Extract the relevant columns
         timestamps = data['timestamp'].values
@@ -103,20 +53,16 @@ for idx, speed in enumerate(speeds):
         dt = compute_average_dt(timestamps)
 
         # Compute average data across periods
-        avg_data1, avg_data2, _ = compute_average_data(timestamps, foot_contact1, data1, data2, factor=FACTOR, offset=True)
+        avg_data1, avg_data2, _ = compute_average_data(timestamps, foot_contact1, data1, data2, PERIOD_OFFSET, factor=FACTOR, offset=True)
 
         avg_data1_list.append(avg_data1)
         avg_data2_list.append(avg_data2)
 
 
 
-    # Find the maximum length of averaged data for the current speed
-    max_length = max(len(data) for data in avg_data1_list)
-
     # Pad averaged data with NaN values to make them the same length
-    for i in range(len(avg_data1_list)):
-        avg_data1_list[i] = np.pad(avg_data1_list[i], (0, max_length - len(avg_data1_list[i])), constant_values=np.nan)
-        avg_data2_list[i] = np.pad(avg_data2_list[i], (0, max_length - len(avg_data2_list[i])), constant_values=np.nan)
+    avg_data1_list = pad_to_max_length(avg_data1_list, np.nan)
+    avg_data2_list = pad_to_max_length(avg_data2_list, np.nan)
 
     # Compute the overall average for the current speed
     avg_data1 = np.nanmean(avg_data1_list, axis=0)
@@ -3,10 +3,17 @@ import numpy as np
 import matplotlib.pyplot as plt
 import os
 from sklearn.linear_model import LinearRegression
+from DataCache import DataCache
+from BatchProcessor import process_file_groups
+
+# Parsed logs are cached on disk, see DataCache.py
+cache = DataCache()
+
+WORKERS = None  # Number of worker processes, None for one per core
 
 # Function to process jump height data
 def process_jump_height(file_path):
-    jump_height_data = pd.read_csv(file_path)
+    jump_height_data = cache.read_log(file_path)
     jump_height = jump_height_data.iloc[:, 28]
     jump_height_inverted = -jump_height
     threshold = (jump_height_inverted.min() + jump_height_inverted.max()) / 2
@@ -26,7 +33,7 @@ def process_jump_height(file_path):
 
 # Function to process motor controller data
 def process_motor_data(file_path):
-    motor_data = pd.read_csv(file_path)
+    motor_data = cache.read_log(file_path)
     motor_data['timestamp'] = pd.to_numeric(motor_data['timestamp'])
     period_energies = []
     foot_contact = motor_data['foot_contact 1']
@@ -48,21 +55,20 @@ def process_motor_data(file_path):
     average_energy = sum(period_energies) / len(period_energies) if period_energies else 0
     return average_energy
 
-# Function to process a set of files
-def process_file_set(file_set, jump_height_dir='./optitrack', motor_data_dir='./'):
-    jump_heights = []
-    energies = []
-    for file_name in file_set:
-        jump_height_file = os.path.join(jump_height_dir, file_name)
-        motor_data_file = os.path.join(motor_data_dir, file_name)
-        
-        jump_height = process_jump_height(jump_height_file)
-        energy = process_motor_data(motor_data_file)
-        
-        jump_heights.append(jump_height)
-        energies.append(energy)
-    
-    return energies, jump_heights
+# Function to process one file, run in a worker process
+def process_file(file_name, jump_height_dir='./optitrack', motor_data_dir='./'):
+    jump_height = cache.get_features(os.path.join(jump_height_dir, file_name), process_jump_height)
+    energy = cache.get_features(os.path.join(motor_data_dir, file_name), process_motor_data)
+    return energy, jump_height
+
+# Function to process the file sets, the files of all sets are processed in parallel
+def process_file_sets(file_sets):
+    results = []
+    for file_results in process_file_groups(process_file, file_sets, workers=WORKERS):
+        energies = [energy for energy, _ in file_results]
+        jump_heights = [jump_height for _, jump_height in file_results]
+        results.append((energies, jump_heights))
+    return results
 
 # List of file sets
 file_sets = [
@@ -88,16 +94,18 @@ legends = [
     'Passive'
 ]
 
+# Process every file set once, the results are used for the axis range and for the plot
+results = process_file_sets(file_sets)
+
 # Plot the results
 plt.figure(figsize=(9, 9))
 
 # Compute global x-axis range for full extension of linear fits
-all_energies = [energy for file_set in file_sets for energy in process_file_set(file_set)[0]]
+all_energies = [energy for energies, _ in results for energy in energies]
 x_min, x_max = min(all_energies), max(all_energies)
 x_range = np.linspace(x_min, x_max, 100).reshape(-1, 1)  # Adding some margin to the range
 
-for idx, (file_set, color, marker, legend) in enumerate(zip(file_sets, colors, markers, legends)):
-    energies, jump_heights = process_file_set(file_set)
+for idx, ((energies, jump_heights), color, marker, legend) in enumerate(zip(results, colors, markers, legends)):
     x = np.array(energies).reshape(-1, 1)
     y = np.array(jump_heights)
     
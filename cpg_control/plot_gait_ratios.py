@@ -1,6 +1,10 @@
-import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
+from GaitCycles import compute_average_dt, cycle_mean, debounce_cycles, find_cycles, pad_to_max_length, segment_cycles
+from DataCache import DataCache
+
+# Parsed logs are cached on disk, see DataCache.py
+cache = DataCache()
 
 FACTOR = 1
 PERIOD_OFFSET = 0.5
@@ -46,80 +50,26 @@ thresholds = [0.5, 0.5, 0.5, 0.8, 0.8]
 speeds = [1, 1.5, 2, 2.5, 3]  # Corresponding speeds in km/h
 
 def compute_average_data(timestamps, foot_contact1, data1, data2, threshold, factor=1.0, offset=False):
-    avg_data1 = []
-    avg_data2 = []
-
-    # Identify the transition points from False to True in foot_contact 1
-    transitions = np.where((foot_contact1[:-1] == False) & (foot_contact1[1:] == True))[0]
-
-    # List to store data for each period
-    periods_data1 = []
-    periods_data2 = []
-
-    for i in range(len(transitions)-1):
-        start_index = transitions[i] - int(PERIOD_OFFSET / dt)  # 0.5 seconds before transition
-
-        if i < len(transitions) - 1:
-            end_index = transitions[i + 1] - int(PERIOD_OFFSET / dt)
-        else:
-            end_index = len(timestamps) - 1 - int(PERIOD_OFFSET / dt)
+    dt = compute_average_dt(timestamps)
 
-        period_data1 = data1[start_index:end_index]
-        period_data2 = data2[start_index:end_index]
+    # Periods between transitions from False to True in foot_contact 1, the period after the last transition is left out
+    starts, ends = find_cycles(foot_contact1, dt, PERIOD_OFFSET, drop_last=True)
+    lengths = ends - starts
 
-        periods_data1.append(period_data1)
-        periods_data2.append(period_data2)
+    # Debounce each period's data and then calculate the average, with the factor for unit conversion
+    debounced_periods_data1 = debounce_cycles(segment_cycles(data1, starts, ends), lengths, FRONT_THR)
+    debounced_periods_data2 = debounce_cycles(segment_cycles(data2, starts, ends), lengths, threshold)
 
-    # Debounce each period's data and then calculate the average
-    debounced_periods_data1 = [debounce_foot_contact(pd, FRONT_THR) for pd in periods_data1]
-    debounced_periods_data2 = [debounce_foot_contact(pd, threshold) for pd in periods_data2]
-
-    # Find the maximum length of periods to align data
-    max_length = max(len(debounced_periods_data1[i]) for i in range(len(debounced_periods_data1)))
-
-    # Calculate average across all periods for each data point
-    for j in range(max_length):
-        avg_data1.append(np.mean([debounced_periods_data1[i][j] for i in range(len(debounced_periods_data1)) if j < len(debounced_periods_data1[i])]))
-        avg_data2.append(np.mean([debounced_periods_data2[i][j] for i in range(len(debounced_periods_data2)) if j < len(debounced_periods_data2[i])]))
-
-    # Apply the factor for unit conversion
-    avg_data1 = np.array(avg_data1) * factor
-    avg_data2 = np.array(avg_data2) * factor
+    avg_data1 = cycle_mean(debounced_periods_data1) * factor
+    avg_data2 = cycle_mean(debounced_periods_data2) * factor
 
     if offset:
         # Offset positions to start at y=0
-        avg_data1 = np.array(avg_data1) - avg_data1[0]
-        avg_data2 = np.array(avg_data2) - avg_data2[0]
+        avg_data1 = avg_data1 - avg_data1[0]
+        avg_data2 = avg_data2 - avg_data2[0]
 
     return avg_data1, avg_data2, dt
 
-# Function to compute average time step (dt) from timestamps
-def compute_average_dt(timestamps):
-    dt = np.mean(np.diff(timestamps))  # Calculate mean time difference
-    return dt
-
-def debounce_foot_contact(data, threshold, alpha = 1):
-    debounced = np.zeros_like(data, dtype=int)
-    in_contact = False
-    contact_start = -1
-    data_copy = data.copy()
-    for i in range(1, len(data)):
-        data_copy[i] = data_copy[i-1]*(1-alpha) + data[i]*alpha
-        if not in_contact and data_copy[i] - data_copy[0] > threshold:
-            in_contact = True
-            contact_start = i
-        elif in_contact and data_copy[i] - data_copy[0] <= threshold:
-            break
-    if contact_start != -1:
-        debounced[contact_start:i] = 1
-    return debounced
-
-# Helper function to pad arrays to the same length
-def pad_to_max_length(arrays, pad_value=0):
-    max_length = max(len(arr) for arr in arrays)
-    padded_arrays = np.array([np.pad(arr, (0, max_length - len(arr)), 'constant', constant_values=pad_value) for arr in arrays])
-    return padded_arrays
-
 # Compute metrics for plotting
 stance_time_flight_time_ratio = []
 stance_time_front_period_ratio = []
@@ -133,7 +83,7 @@ for i, speed_files in enumerate(file_paths):
 
     for file_path in speed_files:
         # Load the data from the CSV file
-        data = pd.read_csv(file_path)
+        data = cache.read_log(file_path)
 
         # Extract the relevant columns
         timestamps = data['timestamp'].values
@@ -1,6 +1,9 @@
-import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
+from DataCache import DataCache
+
+# Parsed logs are cached on disk, see DataCache.py
+cache = DataCache()
 
 # Define the conversion factor from motor turns to degrees and reduction ratio
 turns_to_degrees = 360
@@ -39,7 +42,7 @@ for speed, files in file_paths.items():
     
     for file_path in files:
         # Load the CSV file
-        df = pd.read_csv(file_path)
+        df = cache.read_log(file_path)
         
         # Convert positions from motor turns to degrees and apply reduction ratio
         df['position 1'] = (df['position 1'] * turns_to_degrees) / reduction_ratio
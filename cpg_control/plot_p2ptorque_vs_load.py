@@ -1,6 +1,13 @@
-import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
+from GaitCycles import compute_average_dt, cycle_peak_to_peak, find_cycles, segment_cycles
+from DataCache import DataCache
+from BatchProcessor import process_file_groups
+
+# Parsed logs are cached on disk, see DataCache.py
+cache = DataCache()
+
+WORKERS = None  # Number of worker processes, None for one per core
 
 PERIOD_OFFSET = 0.35  # Offset in seconds before and after foot contact
 
@@ -18,62 +25,38 @@ loads = [0.25, 0.50, 0.75, 1.00, 1.25, 1.50, 1.75]  # Corresponding loads in kg
 
 # Function to compute peak-to-peak power for each period and average them
 def compute_peak_to_peak_power(timestamps, foot_contact1, power):
-    # Identify the transition points from False to True in foot_contact1
-    transitions = np.where((foot_contact1[:-1] == False) & (foot_contact1[1:] == True))[0]
-
-    # List to store peak-to-peak power for each period
-    peak_to_peak_powers = []
+    # Periods between transitions from False to True in foot_contact1
+    starts, ends = find_cycles(foot_contact1, compute_average_dt(timestamps), PERIOD_OFFSET)
+    peak_to_peak_powers = cycle_peak_to_peak(segment_cycles(power, starts, ends))
 
-    for i in range(len(transitions)):
-        start_index = transitions[i] - int(PERIOD_OFFSET / dt)  # 0.35 seconds before transition
-
-        if i < len(transitions) - 1:
-            end_index = transitions[i + 1] - int(PERIOD_OFFSET / dt)
-        else:
-            end_index = len(timestamps) - 1 - int(PERIOD_OFFSET / dt)
-
-        period_power = power[start_index:end_index]
+    # Compute average peak-to-peak power
+    return np.nanmean(peak_to_peak_powers)
 
-        peak_to_peak_power = np.nanmax(period_power) - np.nanmin(period_power)
-        peak_to_peak_powers.append(peak_to_peak_power)
+# Function to process one file, run in a worker process
+def process_file(file_path):
+    # Load the data from the CSV file
+    data = cache.read_log(file_path)
 
-    # Compute average peak-to-peak power
-    avg_peak_to_peak_power = np.nanmean(peak_to_peak_powers)
+    # Extract the relevant columns
+    timestamps = data['timestamp'].values
+    foot_contact1 = data['foot_contact 1'].values
+    power1 = data['torque 1'].values
+    power2 = data['torque 3'].values
 
-    return avg_peak_to_peak_power
+    # Compute peak-to-peak power for each period
+    avg_peak_to_peak_power1 = compute_peak_to_peak_power(timestamps, foot_contact1, power1)
+    avg_peak_to_peak_power2 = compute_peak_to_peak_power(timestamps, foot_contact1, power2)
+    return avg_peak_to_peak_power1, avg_peak_to_peak_power2
 
-# Function to compute average time step (dt) from timestamps
-def compute_average_dt(timestamps):
-    dt = np.mean(np.diff(timestamps))  # Calculate mean time difference
-    return dt
+# Process the files of all loads in parallel
+results = process_file_groups(process_file, [file_paths[load] for load in loads], workers=WORKERS)
 
-# Iterate over each load and process the corresponding files
 average_peak_to_peak_powers1 = []
 average_peak_to_peak_powers2 = []
 
-for load in loads:
-    peak_to_peak_powers1_list = []
-    peak_to_peak_powers2_list = []
-
-    for file_path in file_paths[load]:
-        # Load the data from the CSV file
-        data = pd.read_csv(file_path)
-
-        # Extract the relevant columns
-        timestamps = data['timestamp'].values
-        foot_contact1 = data['foot_contact 1'].values
-        power1 = data['torque 1'].values
-        power2 = data['torque 3'].values
-
-        # Compute average dt from timestamps
-        dt = compute_average_dt(timestamps)
-
-        # Compute peak-to-peak power for each period
-        avg_peak_to_peak_power1 = compute_peak_to_peak_power(timestamps, foot_contact1, power1)
-        avg_peak_to_peak_power2 = compute_peak_to_peak_power(timestamps, foot_contact1, power2)
-
-        peak_to_peak_powers1_list.append(avg_peak_to_peak_power1)
-        peak_to_peak_powers2_list.append(avg_peak_to_peak_power2)
+for load_results in results:
+    peak_to_peak_powers1_list = [power1 for power1, _ in load_results]
+    peak_to_peak_powers2_list = [power2 for _, power2 in load_results]
 
     # Compute the overall average peak-to-peak power for the current load
     overall_avg_peak_to_peak_power1 = np.nanmean(peak_to_peak_powers1_list)
@@ -1,6 +1,9 @@
-import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
+from DataCache import DataCache
+
+# Parsed logs are cached on disk, see DataCache.py
+cache = DataCache()
 
 # List of treadmill speeds and corresponding CSV files
 speeds = [1, 1.5, 2, 2.5, 3]  # in km/h
@@ -46,7 +49,7 @@ for speed in speeds:
     # Iterate over each file for the current speed
     for file_path in file_paths[speed]:
         # Load the data from the CSV file
-        data = pd.read_csv(file_path)
+        data = cache.read_log(file_path)
         
         # Extract the relevant columns
         timestamps = data['timestamp'].values
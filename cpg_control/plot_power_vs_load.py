@@ -1,6 +1,10 @@
-import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
+from GaitCycles import compute_average_dt, cycle_max, find_cycles, segment_cycles
+from DataCache import DataCache
+
+# Parsed logs are cached on disk, see DataCache.py
+cache = DataCache()
 
 PERIOD_OFFSET = 0.35  # Offset in seconds before and after foot contact
 
@@ -18,33 +22,12 @@ loads = [0.25, 0.50, 0.75, 1.00, 1.25, 1.50, 1.75]  # Corresponding loads in kg
 
 # Function to compute peak power for each period and average them
 def compute_peak_power(timestamps, foot_contact1, power):
-    # Identify the transition points from False to True in foot_contact1
-    transitions = np.where((foot_contact1[:-1] == False) & (foot_contact1[1:] == True))[0]
-
-    # List to store peak power for each period
-    peak_powers = []
-
-    for i in range(len(transitions)):
-        start_index = transitions[i] - int(PERIOD_OFFSET / dt)  # 0.35 seconds before transition
-
-        if i < len(transitions) - 1:
-            end_index = transitions[i + 1] - int(PERIOD_OFFSET / dt)
-        else:
-            end_index = len(timestamps) - 1 - int(PERIOD_OFFSET / dt)
-
-        period_power = power[start_index:end_index]
-
-        peak_powers.append(np.nanmax(period_power))
+    # Periods between transitions from False to True in foot_contact1
+    starts, ends = find_cycles(foot_contact1, compute_average_dt(timestamps), PERIOD_OFFSET)
+    peak_powers = cycle_max(segment_cycles(power, starts, ends))
 
     # Compute average peak power
-    avg_peak_power = np.nanmean(peak_powers)
-
-    return avg_peak_power
-
-# Function to compute average time step (dt) from timestamps
-def compute_average_dt(timestamps):
-    dt = np.mean(np.diff(timestamps))  # Calculate mean time difference
-    return dt
+    return np.nanmean(peak_powers)
 
 # Iterate over each load and process the corresponding files
 average_peak_powers1 = []
@@ -56,7 +39,7 @@ for load in loads:
 
     for file_path in file_paths[load]:
         # Load the data from the CSV file
-        data = pd.read_csv(file_path)
+        data = cache.read_log(file_path)
 
         # Extract the relevant columns
         timestamps = data['timestamp'].values
@@ -0,0 +1,60 @@
+import time
+import numpy as np
+import pandas as pd
+from HopfNetwork import GAITS
+from HopfEnsemble import make_grid, synthetic_foot_contact, load_foot_contact, run_sweep
+
+# Sweep HopfNetwork parameters offline and rank the parameter sets by phase-locking error
+# The foot contact of a recorded log is used for every gait when FILE_NAME is set, otherwise each gait is driven by
+# a synthetic foot contact of its own footfall sequence
+FILE_NAME = None                # e.g. "PASSIVE_20240722_175536.csv"
+DT = 0.01
+DURATION = 20                   # length of the synthetic foot contact sequence (s)
+CONTACT_PERIOD = 1.0
+CHUNK_SIZE = 1000               # parameter sets stepped together, bounds the memory of a worker
+WORKERS = None                  # Number of worker processes, None for one per core
+RESULT_FILE = "hopf_sweep.csv"
+NUM_BEST = 10
+
+GRID = {
+    "omega_swing": 2*np.pi*np.linspace(0.25, 2, 8),
+    "omega_stance": 2*np.pi*np.linspace(0.25, 2, 8),
+    "alpha": [5, 10, 20, 50],
+    "coupling_strength": [0.5, 1, 2, 4, 8],
+    "amp_swing": [np.pi/8, np.pi/4],
+    "gait": ["TROT", "PACE", "BOUND", "WALK"],
+}
+
+def main():
+    params = make_grid(**GRID)
+    num_sets = len(params["gait"])
+
+    # Parameter sets are grouped by the foot contact driving them
+    if FILE_NAME is not None:
+        dt, foot_contact = load_foot_contact(FILE_NAME)
+        groups = [(np.arange(num_sets), foot_contact)]
+    else:
+        dt = DT
+        groups = [(np.flatnonzero(params["gait"] == gait),
+                   synthetic_foot_contact(int(DURATION/dt), dt, period=CONTACT_PERIOD, F_seq=GAITS[gait]))
+                  for gait in np.unique(params["gait"])]
+    num_steps = len(groups[0][1])
+    print(f"{num_sets} parameter sets, {num_steps} steps of {dt*1e3:.1f} ms")
+
+    start = time.perf_counter()
+    metrics = {}
+    for idx, foot_contact in groups:
+        group_metrics = run_sweep({name: values[idx] for name, values in params.items()}, foot_contact, dt,
+                                  chunk_size=CHUNK_SIZE, workers=WORKERS)
+        for metric, values in group_metrics.items():
+            metrics.setdefault(metric, np.zeros(num_sets))[idx] = values
+    elapsed = time.perf_counter() - start
+    print(f"Simulated in {elapsed:.1f} s ({elapsed/num_sets/num_steps*1e9:.0f} ns per set and step)")
+
+    results = pd.DataFrame({**params, **metrics})
+    results.to_csv(RESULT_FILE, index=False)
+    print(f"Converged: {np.count_nonzero(~np.isnan(metrics['convergence_time']))}/{num_sets}, results saved to {RESULT_FILE}")
+    print(results.sort_values(["phase_error", "convergence_time"]).head(NUM_BEST).to_string(index=False))
+
+if __name__ == "__main__":
+    main()
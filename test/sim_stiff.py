@@ -0,0 +1,42 @@
+import asyncio
+import os
+import sys
+import time
+import moteus
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cpg_control'))
+from PAWS import PAWS, UPDATE_MODES
+from SimController import SimBackend
+
+# Check that simulated controllers report velocity and torque while a STIFF command moves the joints,
+# with a recapture sent on every tick
+NUM_TICKS = 50
+TIMESTEP = 0.01
+
+async def run(update_mode):
+    paws = PAWS(mode="STIFF", controller_ids=[1, 3], max_torque=3, update_mode=update_mode, backend=SimBackend(),
+                recapture_mode="ALWAYS", verbose=False)
+    await paws.create_controllers()
+    position, velocity, torque = np.zeros(NUM_TICKS), np.zeros(NUM_TICKS), np.zeros(NUM_TICKS)
+    for k in range(NUM_TICKS):
+        await paws.update(time.time())
+        values = paws.states[0].values
+        position[k] = values[moteus.Register.POSITION]
+        velocity[k] = values[moteus.Register.VELOCITY]
+        torque[k] = values[moteus.Register.TORQUE]
+        await asyncio.sleep(TIMESTEP)
+
+    moving = np.abs(np.diff(position)) > 1e-3
+    assert np.any(moving), "joint did not move"
+    assert np.all(velocity[1:][moving] != 0), "zero velocity reported while moving"
+    assert np.all(torque[1:][moving] != 0), "zero torque reported while moving"
+    print(f"{update_mode}: position {position[0]:.2f} -> {position[-1]:.2f} turns, "
+          f"max velocity {np.max(velocity):.2f} turns/s, max torque {np.max(torque):.2f} Nm")
+
+async def main():
+    for update_mode in UPDATE_MODES:
+        await run(update_mode)
+
+if __name__ == "__main__":
+    asyncio.run(main())